@@ -1,11 +1,8 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-import random
+from src.RandomStreams import BLOCK_SIZE, make_generator
 from src.Route import Route
-from src.Direction import Direction
-from src.SurroundingPheromone import SurroundingPheromone
-from Coordinate import Coordinate
 
 #Class that represents the ants functionality.
 class Ant:
@@ -13,124 +10,107 @@ class Ant:
     # Constructor for ant taking a Maze and PathSpecification.
     # @param maze Maze the ant will be running in.
     # @param spec The path specification consisting of a start coordinate and an end coordinate.
-    def __init__(self, maze, path_specification):
+    # @param online_loop_erasure whether to erase loops while walking, so only the loop free path is kept in memory,
+    # instead of erasing them from the full walk after reaching the end.
+    # @param rng seed or numpy Generator of the ant, see RandomStreams.make_generator.
+    def __init__(self, maze, path_specification, online_loop_erasure=False, rng=None):
         self.maze = maze
+        self.online_loop_erasure = online_loop_erasure
         self.start = path_specification.get_start()
         self.end = path_specification.get_end()
         self.current_position = self.start
-        self.rand = random
+        self.rng = make_generator(rng)
+        # amount of steps of the last walk, including the ones that were erased as loops
+        self.steps = 0
 
-    # function to check if a point is a dead end
-    def dead_end(self, curr_pos, prev_direction):
-        if not prev_direction is None:
-            surrounding_pheromones = self.maze.get_surrounding_pheromone(curr_pos)
-            total = surrounding_pheromones.get_total_surrounding_pheromone()
-            pheromone_prev = surrounding_pheromones.get(self.opposite_direction(prev_direction))
-            return total - pheromone_prev == 0
-        else:
-            return False
-
-    # function to get the opposite direction of a direction
-    def opposite_direction(self, dir):
-        if dir == Direction.north:
-            return Direction.south
-        elif dir == Direction.south:
-            return Direction.north
-        elif dir == Direction.east:
-            return Direction.west
-        elif dir == Direction.west:
-            return Direction.east
-
-    # Method that performs a single run through the maze by the ant.
+    # Method that performs a single run through the maze by the ant. Positions are cell ids of the maze, every step
+    # looks up the neighbours in the index of the maze and their pheromones in the flattened pheromone grid.
     # @return The route the ant found through the maze.
     def find_route(self):
-        # Add start position to the route
-        route = Route(self.start)
+        neighbours = self.maze.get_neighbour_list()
+        pheromones = self.maze.pheromones.ravel()
+        end_id = self.maze.cell_id(self.end)
         # get the current position
-        curr_pos = Coordinate(self.start.get_x(), self.start.get_y())
-        # list of coordinates the ant goes through
-        coords = [curr_pos]
-        # initialize previous_direction variable
-        prev_direction = None
+        curr_cell = self.maze.cell_id(self.start)
+        # list of cells the ant goes through and the direction values it took
+        cells = [curr_cell]
+        codes = []
+        # index of every cell in cells, only used when erasing loops while walking
+        path_index = {curr_cell: 0}
+        # initialize previous direction, -1 before the first step
+        prev_direction = -1
+        # amount of steps taken
+        steps = 0
+        # uniforms for the choices of the coming steps, drawn a block at a time
+        draws = []
+        draw = 0
 
         # loop until end position is found
-        while not curr_pos.__eq__(self.end):
-            # Get the surrounding pheromones of the current position
-            surrounding_pheromones = self.maze.get_surrounding_pheromone(curr_pos)
-            total = surrounding_pheromones.get_total_surrounding_pheromone()
-
-            # Get the weights of each direction by getting the ratio of the pheromones
-            weights = [surrounding_pheromones.get(Direction.north)/total,
-                       surrounding_pheromones.get(Direction.south)/total,
-                       surrounding_pheromones.get(Direction.east)/total,
-                       surrounding_pheromones.get(Direction.west)/total]
+        while curr_cell != end_id:
+            # Get the pheromones of the neighbouring cells, walls and the outside of the maze have none
+            row = neighbours[curr_cell]
+            weights = [pheromones[n] if n >= 0 else 0.0 for n in row]
 
             # if the current position isn't a dead end, make the weight of the direction the ant just came from equal
             # to 0 to prevent the ant from going backwards when it's not necessary
-            if not self.dead_end(curr_pos, prev_direction):
-                if prev_direction == Direction.north:
-                    total -= surrounding_pheromones.get(Direction.south)
-                    weights = [surrounding_pheromones.get(Direction.north) / total,
-                               0,
-                               surrounding_pheromones.get(Direction.east) / total,
-                               surrounding_pheromones.get(Direction.west) / total]
-                elif prev_direction == Direction.south:
-                    total -= surrounding_pheromones.get(Direction.north)
-                    weights = [0,
-                               surrounding_pheromones.get(Direction.south) / total,
-                               surrounding_pheromones.get(Direction.east) / total,
-                               surrounding_pheromones.get(Direction.west) / total]
-                elif prev_direction == Direction.east:
-                    total -= surrounding_pheromones.get(Direction.west)
-                    weights = [surrounding_pheromones.get(Direction.north) / total,
-                               surrounding_pheromones.get(Direction.south) / total,
-                               surrounding_pheromones.get(Direction.east) / total,
-                               0]
-                elif prev_direction == Direction.west:
-                    total -= surrounding_pheromones.get(Direction.east)
-                    weights = [surrounding_pheromones.get(Direction.north) / total,
-                               surrounding_pheromones.get(Direction.south) / total,
-                               0,
-                               surrounding_pheromones.get(Direction.west) / total]
+            if prev_direction >= 0:
+                back = (prev_direction + 2) % 4
+                if weights[0] + weights[1] + weights[2] + weights[3] - weights[back] > 0:
+                    weights[back] = 0.0
 
             # Randomly choose a direction based on the weights of the pheromones
-            direction = self.rand.choices([Direction.north, Direction.south, Direction.east, Direction.west], weights, k=1)
+            if draw == len(draws):
+                draws = self.rng.random(BLOCK_SIZE).tolist()
+                draw = 0
+            r = draws[draw] * (weights[0] + weights[1] + weights[2] + weights[3])
+            draw += 1
+            direction = 0
+            cumulative = weights[0]
+            while r >= cumulative and direction < 3:
+                direction += 1
+                cumulative += weights[direction]
 
             # Update the position and direction
-            prev_direction = direction[0]
-            curr_pos = curr_pos.add_direction(direction[0])
-            # add coordinate to list of coordinates
-            coords.append(curr_pos)
+            steps += 1
+            prev_direction = direction
+            curr_cell = row[direction]
+            if self.online_loop_erasure and curr_cell in path_index:
+                # back on the path: drop the loop that was just closed
+                index = path_index[curr_cell]
+                for dropped in cells[index + 1:]:
+                    del path_index[dropped]
+                del cells[index + 1:]
+                del codes[index:]
+                continue
+            # add cell to list of cells
+            if self.online_loop_erasure:
+                path_index[curr_cell] = len(cells)
+            cells.append(curr_cell)
             # add direction to route
-            route.add(direction[0])
+            codes.append(direction)
 
-        # Looping and back-tracking elimination: done by going over the route the ant made from teh start and making
-        # sure no coordinates are repeated. If there is a repeat, delete all coordinates between the 2 repetitions.
+        self.steps = steps
+        if self.online_loop_erasure:
+            return Route.from_codes(self.start, codes)
 
-        # create a new route
-        final_route = Route(self.start)
-        # save the old route
-        saved_route = route.get_route()
+        # Looping and back-tracking elimination: done by going over the route the ant made from the start and making
+        # sure no cells are repeated. If there is a repeat, delete all cells between the 2 repetitions.
+
+        # index of the last visit of every cell, so jumping past a loop takes constant time
+        last_visit = {}
+        for index, cell in enumerate(cells):
+            last_visit[cell] = index
+        final_codes = []
         # initialize index at 0
         curr_index = 0
-        # initialize coordinates
-        curr_pos = coords[curr_index]
 
         # loop until end position is found
-        while not curr_pos.__eq__(self.end):
-            # start at the end of the list of coordinates to search for repetitions of current position
-            for j in range(len(coords)-1, curr_index, -1):
-                # if a repetition is found, move to that index
-                if curr_pos.__eq__(coords[j]):
-                    curr_index = j
-                    break
-
-            # add the current route direction to the final_route
-            final_route.add(saved_route[curr_index])
+        while cells[curr_index] != end_id:
+            # move to the last repetition of the current position
+            curr_index = last_visit[cells[curr_index]]
+            # add the current route direction to the final route
+            final_codes.append(codes[curr_index])
             # increment index
-            curr_index+=1
-            # increment position
-            curr_pos = coords[curr_index]
-
-        return final_route
+            curr_index += 1
 
+        return Route.from_codes(self.start, final_codes)
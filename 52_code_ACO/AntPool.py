@@ -0,0 +1,110 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import multiprocessing
+import tempfile
+import weakref
+
+import numpy as np
+from src.Ant import Ant
+from src.Maze import Maze
+from src.RandomStreams import make_generator, spawn_generators
+from src.VectorizedAnts import VectorizedAnts
+
+# Maze of the worker process, its pheromones are a read-only view on the memory-mapped grid of the pool.
+worker_maze = None
+worker_engine = None
+worker_online_loop_erasure = False
+
+# Set up a worker process: rebuild the maze and map the shared pheromone grid read-only.
+# @param walls walls of the maze.
+# @param width width of the maze.
+# @param length length of the maze.
+# @param pheromone_file path of the memory-mapped pheromone grid.
+# @param engine "ant" or "vectorized", see AntColonyOptimization.
+# @param online_loop_erasure whether ants erase loops while walking, see Ant.
+def init_worker(walls, width, length, pheromone_file, engine, online_loop_erasure):
+    global worker_maze, worker_engine, worker_online_loop_erasure
+    worker_maze = Maze(walls, width, length)
+    worker_maze.pheromones = np.memmap(pheromone_file, dtype=np.float64, mode="r", shape=(width, length))
+    worker_engine = engine
+    worker_online_loop_erasure = online_loop_erasure
+
+# Let a number of ants search for the finish inside a worker process.
+# @param path_specification the path specification of the ants.
+# @param ants amount of ants to run.
+# @param rngs numpy Generators of the ants: one per ant, or a single one for the vectorized engine.
+# @return the routes found by the ants
+def find_routes(path_specification, ants, rngs):
+    if worker_engine == "vectorized":
+        return VectorizedAnts(worker_maze, path_specification, ants, rngs[0]).find_routes()
+    return [Ant(worker_maze, path_specification, worker_online_loop_erasure, rng).find_route() for rng in rngs]
+
+# Pool of worker processes that run the ants of a generation in parallel. The pheromone grid lives in a memory-mapped
+# file: the maze of the caller writes to it while evaporating and adding pheromones, the workers only read it. Nothing
+# but the path specification and the resulting routes travels between the processes during a generation.
+class AntPool:
+
+    # Constructs a new pool for a maze.
+    # @param maze the maze the ants will be running in.
+    # @param workers amount of worker processes.
+    # @param engine "ant" or "vectorized", the engine the workers use to run their ants.
+    # @param online_loop_erasure whether ants erase loops while walking, see Ant.
+    def __init__(self, maze, workers, engine="ant", online_loop_erasure=False):
+        self.workers = workers
+        self.engine = engine
+        self.shape = (maze.get_width(), maze.get_length())
+        # keep the grid in memory backed storage where the platform offers it
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        handle, self.pheromone_file = tempfile.mkstemp(prefix="pheromones", suffix=".dat", dir=directory)
+        os.close(handle)
+        # remove the grid at exit as well, in case the pool is never closed
+        self.remove_file = weakref.finalize(self, os.remove, self.pheromone_file)
+        self.pheromones = np.memmap(self.pheromone_file, dtype=np.float64, mode="w+", shape=self.shape)
+        self.pool = multiprocessing.Pool(workers, initializer=init_worker,
+                                         initargs=(maze.walls, self.shape[0], self.shape[1], self.pheromone_file,
+                                                   engine, online_loop_erasure))
+
+    # Move the pheromones of the maze into the shared grid. From now on the maze updates the shared grid in place.
+    # @param maze the maze to attach.
+    def attach(self, maze):
+        self.pheromones[:] = maze.pheromones
+        maze.pheromones = self.pheromones
+
+    # Give the maze a private copy of the shared pheromones again.
+    # @param maze the maze to detach.
+    def detach(self, maze):
+        maze.pheromones = np.array(self.pheromones)
+
+    # Let a generation of ants search for the finish, spread over the workers.
+    # @param path_specification the path specification of the ants.
+    # @param ants amount of ants in the generation.
+    # @param rng seed or numpy Generator. Every ant gets a child generator spawned from it (in the same way as
+    # AntColonyOptimization does without workers), with the vectorized engine every chunk of ants gets one.
+    # @return the routes found by the ants
+    def find_routes(self, path_specification, ants, rng=None):
+        chunks = [len(c) for c in np.array_split(np.arange(ants), self.workers) if len(c) > 0]
+        rng = make_generator(rng)
+        if self.engine == "vectorized":
+            rngs = [[r] for r in spawn_generators(rng, len(chunks))]
+        else:
+            ant_rngs = spawn_generators(rng, ants)
+            bounds = np.cumsum([0] + chunks)
+            rngs = [ant_rngs[bounds[i]:bounds[i + 1]] for i in range(len(chunks))]
+        routes = []
+        for chunk in self.pool.starmap(find_routes, [(path_specification, c, r) for c, r in zip(chunks, rngs)]):
+            routes.extend(chunk)
+        return routes
+
+    # Stop the workers and remove the shared pheromone grid.
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.pheromones = None
+        self.remove_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -3,15 +3,24 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from src.Direction import Direction
 
-# Class representing a coordinate.
+# Class representing a coordinate. Coordinates are immutable and hashable, so they can be used as dict/set keys (and
+# shared, like the DELTAS).
 class Coordinate:
+    __slots__ = ("x", "y")
 
      # Constructs a new coordinate object.
      # @param x the x coordinate
      # @param y the y coordinate
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    # Coordinates can't be changed, their hash depends on x and y.
+    def __setattr__(self, name, value):
+        raise AttributeError("Coordinate is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Coordinate is immutable")
 
     # Add a coordinate to this coordinate
     # @param other the other coordinate to be added
@@ -24,7 +33,8 @@ class Coordinate:
     # @param dir direction of unit move
     # @return result the new coordinate
     def add_direction(self, dir):
-         return self.add_coordinate(self.dir_to_coordinate_delta(dir))
+        delta = DELTAS[dir]
+        return Coordinate(self.x + delta.x, self.y + delta.y)
 
     # Substract a coordinate from the current coordinate
     # @param other the to be subtracted coordinate
@@ -37,7 +47,8 @@ class Coordinate:
         # @return result the new coordinate
 
     def subtract_direction(self, dir):
-        return self.subtract_coordinate(self.dir_to_coordinate_delta(dir))
+        delta = DELTAS[dir]
+        return Coordinate(self.x - delta.x, self.y - delta.y)
 
     # String representation of coordinate
     # @return String representation of coordinate
@@ -48,8 +59,23 @@ class Coordinate:
     # @param other Other Coordinate to check
     # @return boolean whether they're equal
     def __eq__(self, other):
+        if not isinstance(other, Coordinate):
+            return NotImplemented
         return self.x == other.x and self.y == other.y
 
+    # Hash method for Coordinate, consistent with __eq__
+    # @return hash of the coordinate
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    # Pickle as a dict, like coordinates did before they had slots, so old pickles still load.
+    def __getstate__(self):
+        return {"x": self.x, "y": self.y}
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "x", state["x"])
+        object.__setattr__(self, "y", state["y"])
+
 
     # Check whether a point lies between a x range with [low,up)
     # @param low lower bound
@@ -79,11 +105,12 @@ class Coordinate:
     # @param dir the direction
     # @return the coordinate
     def dir_to_coordinate_delta(self, dir):
-        # all directions in a vector
-        # Creates a map with a direction linked to its (direction) vector.
-        map = {}
-        map[Direction.east] = Coordinate(1, 0)
-        map[Direction.west] = Coordinate(-1, 0)
-        map[Direction.north] = Coordinate(0, -1)
-        map[Direction.south] = Coordinate(0, 1)
-        return map[dir]
\ No newline at end of file
+        return DELTAS[dir]
+
+# Map with a direction linked to its (direction) vector.
+DELTAS = {
+    Direction.east: Coordinate(1, 0),
+    Direction.west: Coordinate(-1, 0),
+    Direction.north: Coordinate(0, -1),
+    Direction.south: Coordinate(0, 1),
+}
\ No newline at end of file
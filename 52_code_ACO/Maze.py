@@ -10,6 +10,9 @@ import traceback
 
 # from src.Direction import Direction
 
+# Smallest scale of the pheromones before it is applied to the stored values, see Maze.evaporate.
+MIN_PHEROMONE_SCALE = 1e-100
+
 # Class that holds all the maze data. This means the pheromones, the open and blocked tiles in the system as
 # well as the starting and end coordinates.
 class Maze:
@@ -24,16 +27,62 @@ class Maze:
         self.width = width
         self.start = None
         self.end = None
+        self.build_index()
         self.initialize_pheromones()
 
         self.pheromones = None
 
-    # Initialize pheromones to a start value.
+    # Build the index of the maze. Every cell has an id, x * length + y, which is its index in the flattened pheromone
+    # grid. For every cell id the index holds:
+    # neighbours: the cell id of the neighbour in each direction (indexed by the value of Direction), or -1 if that
+    # neighbour is a wall or outside of the maze.
+    # open_cells: whether the cell is accessible.
+    # degree: the amount of accessible neighbours, 1 for dead ends and 2 for corridors.
+    def build_index(self):
+        open_cells = np.asarray(self.walls) > 0
+        ids = np.arange(self.width * self.length).reshape(self.width, self.length)
+        table = np.full((self.width, self.length, 4), -1, dtype=np.int64)
+        table[:-1, :, Direction.east.value] = ids[1:, :]
+        table[1:, :, Direction.west.value] = ids[:-1, :]
+        table[:, 1:, Direction.north.value] = ids[:, :-1]
+        table[:, :-1, Direction.south.value] = ids[:, 1:]
+        table = table.reshape(self.width * self.length, 4)
+
+        # neighbours that are walls can never be entered
+        self.open_cells = open_cells.ravel()
+        inside = table >= 0
+        blocked = np.zeros_like(inside)
+        blocked[inside] = ~self.open_cells[table[inside]]
+        table[blocked] = -1
+        self.neighbours = table
+        self.degree = (table >= 0).sum(axis=1)
+        self.dead_ends = self.open_cells & (self.degree <= 1)
+        self.corridors = self.open_cells & (self.degree == 2)
+        # the neighbour table as nested lists, built when first needed
+        self.neighbour_list = None
+
+    # The neighbour table as nested lists, which are faster than numpy for looking up single cells.
+    # @return list with the 4 neighbour cell ids of every cell id
+    def get_neighbour_list(self):
+        if self.neighbour_list is None:
+            self.neighbour_list = self.neighbours.tolist()
+        return self.neighbour_list
+
+    # Cell id of a coordinate.
+    # @param position the coordinate.
+    # @return the cell id
+    def cell_id(self, position):
+        return position.get_x() * self.length + position.get_y()
+
+    # Initialize pheromones to a start value. Evaporation is lazy: the actual pheromone of a cell is the stored value in
+    # pheromones times pheromone_scale, so evaporating only shrinks the scale. The ants only compare the pheromones of
+    # neighbouring cells, so they use the stored values as they are.
     def initialize_pheromones(self):
         self.pheromones = np.zeros((len(self.walls), len(self.walls[0])))
         wall = np.copy(self.walls)
         paths = wall > 0
         self.pheromones[paths] = 1.0
+        self.pheromone_scale = 1.0
         return
 
     # Reset the maze for a new shortest path problem.
@@ -44,37 +93,46 @@ class Maze:
     # @param r The route of the ants
     # @param Q Normalization factor for amount of dropped pheromone
     def add_pheromone_route(self, route, q):
-        # Get the list of directions
-        r = route.get_route()
-        # Get the amount to add by
-        amount = 0
-        if len(r) > 0:
-            amount = q/len(r)
-
-        print(len(r))
-
-        # coordinates start
-        coords = route.start
-
-        # trace through the path and update the pheromones by the amount
-        for dir in r:
-            coords = coords.add_direction(dir)
-            # print(coords)
-            self.pheromones[coords.get_x(), coords.get_y()] += amount
-
-        return
+        self.add_pheromone_routes([route], q)
 
-     # Update pheromones for a list of routes
+     # Update pheromones for a list of routes, all at once with a single scatter-add
      # @param routes A list of routes
      # @param Q Normalization factor for amount of dropped pheromone
-    def add_pheromone_routes(self, routes, q):
-        for r in routes:
-            self.add_pheromone_route(r, q)
-
-    # Evaporate pheromone
+     # @param top_k only the k shortest routes drop pheromone, all routes if None
+     # @param rank_weighted weigh the pheromone of the kept routes by rank: the shortest route drops the full amount,
+     # the next ones linearly less
+    def add_pheromone_routes(self, routes, q, top_k=None, rank_weighted=False):
+        routes = sorted((r for r in routes if r.size() > 0), key=lambda r: r.size())
+        if top_k is not None:
+            routes = routes[:top_k]
+        if len(routes) == 0:
+            return
+
+        xs = []
+        ys = []
+        amounts = []
+        for rank, route in enumerate(routes):
+            # every position on the route gets q divided by the length of the route
+            amount = q / route.size()
+            if rank_weighted:
+                amount *= (len(routes) - rank) / len(routes)
+            route_xs, route_ys = route.get_coordinates()
+            xs.append(route_xs)
+            ys.append(route_ys)
+            amounts.append(np.full(route.size(), amount))
+
+        # stored values are multiplied by the scale when read, so store the amounts divided by it
+        np.add.at(self.pheromones, (np.concatenate(xs), np.concatenate(ys)),
+                  np.concatenate(amounts) / self.pheromone_scale)
+
+    # Evaporate pheromone, by shrinking the scale of the pheromones. Once the scale gets so small that the stored
+    # values could overflow, it is applied to them and starts over at 1.
     # @param rho evaporation factor
     def evaporate(self, rho):
-        self.pheromones *= (1 - rho)
+        self.pheromone_scale *= (1 - rho)
+        if self.pheromone_scale < MIN_PHEROMONE_SCALE:
+            self.pheromones *= self.pheromone_scale
+            self.pheromone_scale = 1.0
         return
 
     # Width getter
@@ -91,34 +149,19 @@ class Maze:
     # @param position The position to check the neighbours of.
     # @return the pheromones of the neighbouring positions.
     def get_surrounding_pheromone(self, position):
-        # initialize pheromones to 0
-        north = south = east = west = 0
-
-        # for each direction, check if it is in bounds, if so, get the value in pheromone table
-        north_pos = position.add_direction(Direction.north)
-        if self.in_bounds(north_pos):
-            north = self.pheromones[north_pos.get_x(), north_pos.get_y()]
-
-        east_pos = position.add_direction(Direction.east)
-        if self.in_bounds(east_pos):
-            east = self.pheromones[east_pos.get_x(), east_pos.get_y()]
-
-        south_pos = position.add_direction(Direction.south)
-        if self.in_bounds(south_pos):
-            south = self.pheromones[south_pos.get_x(), south_pos.get_y()]
-
-        west_pos = position.add_direction(Direction.west)
-        if self.in_bounds(west_pos):
-            west = self.pheromones[west_pos.get_x(), west_pos.get_y()]
-
-        sf = SurroundingPheromone(north, east, south, west)
-        return sf
+        # look up the neighbours in the index, walls and positions outside the maze have no pheromone
+        pheromones = self.pheromones.ravel()
+        neighbours = self.get_neighbour_list()[self.cell_id(position)]
+        east, north, west, south = [pheromones[n] * self.pheromone_scale if n >= 0 else 0 for n in neighbours]
+        return SurroundingPheromone(north, east, south, west)
 
     # Pheromone getter for a specific position. If the position is not in bounds returns 0
     # @param pos Position coordinate
     # @return pheromone at point
     def get_pheromone(self, pos):
-        return 0
+        if not self.in_bounds(pos):
+            return 0
+        return self.pheromones[pos.get_x()][pos.get_y()] * self.pheromone_scale
 
     # Check whether a coordinate lies in the current maze.
     # @param position The position to be checked
@@ -143,30 +186,52 @@ class Maze:
 
     # Method that builds a mze from a file
     # @param filePath Path to the file
+    # @param cache whether to keep the parsed walls in a .npy file next to the maze file and load from it while it is
+    # newer than the maze file.
     # @return A maze object with pheromones initialized to 0's inaccessible and 1's accessible.
     @staticmethod
-    def create_maze(file_path):
+    def create_maze(file_path, cache=False):
         try:
-            f = open(file_path, "r")
-            lines = f.read().splitlines()
-            dimensions = lines[0].split(" ")
-            width = int(dimensions[0])
-            length = int(dimensions[1])
-            
-            #make the maze_layout
-            maze_layout = []
-            for x in range(width):
-                maze_layout.append([])
-            
-            for y in range(length):
-                line = lines[y+1].split(" ")
-                for x in range(width):
-                    if line[x] != "":
-                        state = int(line[x])
-                        maze_layout[x].append(state)
+            if cache:
+                walls = Maze.read_cached_walls(file_path)
+            else:
+                walls = Maze.read_walls(file_path)
+            width, length = walls.shape
             print("Ready reading maze file " + file_path)
-            return Maze(maze_layout, width, length)
+            return Maze(walls, width, length)
         except FileNotFoundError:
             print("Error reading maze file " + file_path)
             traceback.print_exc()
-            sys.exit()
\ No newline at end of file
+            sys.exit()
+
+    # Parse the walls of a maze file in one go.
+    # @param file_path Path to the file
+    # @return uint8 array of the walls, indexed [x][y]
+    @staticmethod
+    def read_walls(file_path):
+        with open(file_path, "r") as f:
+            dimensions = f.readline().split()
+            width = int(dimensions[0])
+            length = int(dimensions[1])
+            cells = np.fromstring(f.read(), dtype=np.uint8, sep=" ")
+        if cells.size != width * length:
+            raise ValueError("Maze file " + file_path + " has " + str(cells.size) + " cells, expected "
+                             + str(width * length))
+        # the file holds the maze row by row, so the cells are in [y][x] order
+        return np.ascontiguousarray(cells.reshape(length, width).T)
+
+    # Read the walls of a maze file from its .npy cache, parsing the maze file and writing the cache if it is missing
+    # or out of date. The cache is memory mapped, not read.
+    # @param file_path Path to the maze file
+    # @return uint8 array of the walls, indexed [x][y]
+    @staticmethod
+    def read_cached_walls(file_path):
+        cache_path = file_path + ".npy"
+        if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(file_path):
+            walls = Maze.read_walls(file_path)
+            # write to a temporary file first, so other processes never map a half written cache
+            temporary_path = cache_path + "." + str(os.getpid()) + ".tmp"
+            with open(temporary_path, "wb") as f:
+                np.save(f, walls)
+            os.replace(temporary_path, cache_path)
+        return np.load(cache_path, mmap_mode="r")
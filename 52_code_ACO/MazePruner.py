@@ -0,0 +1,126 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import heapq
+
+import numpy as np
+from src.Maze import Maze
+from src.Route import Route
+
+# Preprocessing of mazes before searching routes in them. Dead ends can never be part of a shortest route (unless a
+# route starts or ends in them), so they can be filled with walls, and corridors without side branches can be walked
+# in one go instead of cell by cell.
+class MazePruner:
+
+    # Fill all dead ends of a maze, repeatedly, until no dead ends are left. Cells that have to be kept (the start and
+    # end of a path specification, product locations) are never filled.
+    # @param maze the maze to prune.
+    # @param keep list of coordinates that must stay accessible.
+    # @return a new maze with the dead ends filled with walls
+    @staticmethod
+    def fill_dead_ends(maze, keep):
+        neighbours = maze.get_neighbour_list()
+        open_cells = maze.open_cells.copy()
+        degree = maze.degree.copy()
+        kept = set(maze.cell_id(coordinate) for coordinate in keep)
+
+        stack = [cell for cell in np.flatnonzero(maze.dead_ends).tolist() if cell not in kept]
+        while len(stack) > 0:
+            cell = stack.pop()
+            if not open_cells[cell] or degree[cell] > 1:
+                continue
+            open_cells[cell] = False
+            # the neighbour loses an exit and may become a dead end itself
+            for neighbour in neighbours[cell]:
+                if neighbour >= 0 and open_cells[neighbour]:
+                    degree[neighbour] -= 1
+                    if degree[neighbour] <= 1 and neighbour not in kept:
+                        stack.append(neighbour)
+
+        walls = open_cells.reshape(maze.get_width(), maze.get_length()).astype(np.uint8)
+        return Maze(walls, maze.get_width(), maze.get_length())
+
+    # Contract the corridors of a maze into the weighted edges of a graph.
+    # @param maze the maze, usually with its dead ends filled already.
+    # @param keep list of coordinates that must be nodes of the graph, such as the start, end and product locations.
+    # @return the corridor graph
+    @staticmethod
+    def contract_corridors(maze, keep):
+        return CorridorGraph(maze, keep)
+
+# Graph of a maze in which every junction, dead end and kept cell is a node and every corridor between two of them is a
+# single edge weighted by its length. Has the same find_shortest_route interface as AntColonyOptimization, for routes
+# between nodes.
+class CorridorGraph:
+
+    # Constructs the corridor graph of a maze.
+    # @param maze the maze.
+    # @param keep list of coordinates that must be nodes of the graph.
+    def __init__(self, maze, keep):
+        self.maze = maze
+        neighbours = maze.get_neighbour_list()
+        nodes = maze.open_cells & (maze.degree != 2)
+        for coordinate in keep:
+            nodes[maze.cell_id(coordinate)] = True
+        self.nodes = set(np.flatnonzero(nodes).tolist())
+
+        # every edge is a tuple of the node it leads to, its length and the direction values along it
+        self.edges = {}
+        for node in self.nodes:
+            self.edges[node] = []
+            for dir, cell in enumerate(neighbours[node]):
+                if cell < 0:
+                    continue
+                codes = [dir]
+                previous = node
+                # follow the corridor until it reaches a node
+                while cell not in self.nodes:
+                    for dir, following in enumerate(neighbours[cell]):
+                        if following >= 0 and following != previous:
+                            break
+                    codes.append(dir)
+                    previous = cell
+                    cell = following
+                if cell != node:
+                    self.edges[node].append((cell, len(codes), codes))
+
+    # Amount of edges in the graph.
+    # @return amount of edges
+    def size(self):
+        return sum(len(edges) for edges in self.edges.values())
+
+    # Find the shortest route between two nodes of the graph with Dijkstra's algorithm.
+    # @param path_specification the path specification, its start and end must be nodes of the graph.
+    # @return the shortest route
+    def find_shortest_route(self, path_specification):
+        start = path_specification.get_start()
+        end = path_specification.get_end()
+        start_id = self.maze.cell_id(start)
+        end_id = self.maze.cell_id(end)
+        if start_id not in self.nodes or end_id not in self.nodes:
+            raise ValueError("Start and end must be kept when contracting the maze: " + str(path_specification))
+
+        distance = {start_id: 0}
+        # node the shortest route to a node comes from, with the edge taken
+        came_from = {start_id: None}
+        queue = [(0, start_id)]
+        while len(queue) > 0:
+            d, node = heapq.heappop(queue)
+            if node == end_id:
+                break
+            if d > distance[node]:
+                continue
+            for other, length, codes in self.edges[node]:
+                if d + length < distance.get(other, sys.maxsize):
+                    distance[other] = d + length
+                    came_from[other] = (node, codes)
+                    heapq.heappush(queue, (d + length, other))
+
+        if end_id not in came_from:
+            raise ValueError("No route from " + str(start) + " to " + str(end))
+        edges = []
+        node = end_id
+        while came_from[node] is not None:
+            node, codes = came_from[node]
+            edges.append(codes)
+        return Route.from_codes(start, [code for codes in reversed(edges) for code in codes])
@@ -0,0 +1,151 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import json
+import logging
+import time
+
+# Sink that drops every record. Metrics with this sink are disabled and don't even start their timers.
+class NullSink:
+
+    def write(self, record):
+        pass
+
+    def close(self):
+        pass
+
+# Sink that writes every record as JSON to a logger.
+class LoggingSink:
+
+    # Constructs a new logging sink.
+    # @param logger the logger to write to, the logger of this module by default.
+    # @param level the level to log the records at.
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logging.getLogger(__name__) if logger is None else logger
+        self.level = level
+
+    def write(self, record):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s", to_json(record))
+
+    def close(self):
+        pass
+
+# Sink that appends every record as a line of JSON to a file.
+class JsonlSink:
+
+    # Constructs a new JSONL sink, the file is opened on the first record.
+    # @param file_path path of the file to append to.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file = None
+
+    def write(self, record):
+        if self.file is None:
+            self.file = open(self.file_path, "a")
+        self.file.write(to_json(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # The file can't be pickled, a copy of the sink (in a worker process) appends through its own.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["file"] = None
+        return state
+
+# Encode a record as JSON, numpy numbers are written as plain numbers.
+# @param record dict of the record.
+# @return the JSON string
+def to_json(record):
+    return json.dumps(record, default=lambda value: value.item() if hasattr(value, "item") else str(value))
+
+# Timer that adds the time spent inside a with block to a metric.
+class Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add(self.name, time.perf_counter() - self.start)
+        return False
+
+# Timer of disabled metrics, it does nothing.
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = NullTimer()
+
+# Counters and timers of the optimizers. Values are added up during a generation and written to the sink as a single
+# record when the generation is emitted, after which they start from zero again. Without a sink (or with a NullSink)
+# the metrics are disabled and every call returns immediately, code that has to do extra work to compute a value
+# should check enabled first.
+class Metrics:
+
+    # Constructs new metrics.
+    # @param sink NullSink, LoggingSink or JsonlSink (or anything with write and close) to send the records to.
+    def __init__(self, sink=None):
+        self.sink = NullSink() if sink is None else sink
+        self.enabled = not isinstance(self.sink, NullSink)
+        self.values = {}
+
+    # Add to a counter.
+    # @param name name of the counter.
+    # @param value amount to add.
+    def add(self, name, value=1):
+        if self.enabled:
+            self.values[name] = self.values.get(name, 0) + value
+
+    # Set a value.
+    # @param name name of the value.
+    # @param value the value.
+    def set(self, name, value):
+        if self.enabled:
+            self.values[name] = value
+
+    # Current value of a counter.
+    # @param name name of the counter.
+    # @param default value if nothing was added to the counter yet.
+    # @return the value
+    def get(self, name, default=0):
+        return self.values.get(name, default)
+
+    # Time a with block, the elapsed seconds are added to a counter.
+    # @param name name of the counter.
+    # @return the timer
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name)
+
+    # Write a record with the current values to the sink and start over.
+    # @param event name of the event, such as "aco_generation".
+    # @param fields further values of the record.
+    def emit(self, event, **fields):
+        if not self.enabled:
+            return
+        record = {"event": event}
+        record.update(fields)
+        record.update(self.values)
+        self.values = {}
+        self.sink.write(record)
+
+    # Close the sink.
+    def close(self):
+        self.sink.close()
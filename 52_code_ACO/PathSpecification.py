@@ -5,6 +5,9 @@ import re
 import traceback
 from src.Coordinate import Coordinate
 
+# separator between the x and y of a coordinate
+SEPARATOR = re.compile("[,;]\\s*")
+
 # Specification of a path containing a start and end coordinate.
 class PathSpecification:
 
@@ -43,14 +46,14 @@ class PathSpecification:
     @staticmethod
     def read_coordinates(file_path):
         try:
-            f = open(file_path, "r")
-            lines = f.read().splitlines()
+            with open(file_path, "r") as f:
+                lines = f.read().splitlines()
 
-            start = re.compile("[,;]\\s*").split(lines[0])
+            start = SEPARATOR.split(lines[0])
             start_x = int(start[0])
             start_y = int(start[1])
 
-            end = re.compile("[,;]\\s*").split(lines[1])
+            end = SEPARATOR.split(lines[1])
             end_x = int(end[0])
             end_y = int(end[1])
 
@@ -0,0 +1,29 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+
+# Random number streams of the solvers. Every solver owns a numpy Generator made from the seed it is given, and the
+# work it hands out gets child generators spawned from it, so runs with the same seed give the same results and the
+# streams of parallel workers are independent. Where every unit of work gets its own child (every ant of the "ant"
+# engine, every route of TSPData.calculate_routes_parallel, every island) the results also don't depend on the amount
+# of workers. The vectorized engine draws for a whole chunk of ants at once, so its results do.
+
+# Amount of uniforms that are drawn at once by code that needs one per step.
+BLOCK_SIZE = 1024
+
+# Turn a seed into a random generator.
+# @param seed None for a generator seeded by the operating system, an int or SeedSequence to seed a new generator
+# with, or a Generator which is used as is.
+# @return numpy Generator
+def make_generator(seed=None):
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+# Spawn independent child generators, their streams don't overlap with each other or with the parent.
+# @param rng the parent Generator.
+# @param count amount of children.
+# @return list of Generators
+def spawn_generators(rng, count):
+    return rng.spawn(count)
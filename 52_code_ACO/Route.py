@@ -1,41 +1,119 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
+from array import array
+
+import numpy as np
+from src.Coordinate import Coordinate
 from src.Direction import Direction
 
-# Class representing a route.
+# Directions indexed by their integer value.
+DIRECTIONS = tuple(sorted(Direction, key=Direction.dir_to_int))
+# Line of the route file format for every direction value.
+LINES = tuple(str(Direction.dir_to_int(dir)) + ";\n" for dir in DIRECTIONS)
+# x and y offset of each direction, indexed by the value of the direction
+X_OFFSETS = np.array([1, 0, -1, 0])
+Y_OFFSETS = np.array([0, -1, 0, 1])
+
+# Class representing a route. The directions are stored compactly as one signed byte per step holding the value of
+# the direction.
 class Route:
 
     # Route takes a starting coordinate to initialize
     # @param start starting coordinate
     def __init__(self, start):
-        self.route = []
+        self.codes = array("b")
         self.start = start
+        # end coordinate, computed when first asked for
+        self.end = None
+
+    # Build a route from direction values
+    # @param start starting coordinate
+    # @param codes iterable of direction values, or bytes
+    # @return the route
+    @staticmethod
+    def from_codes(start, codes):
+        route = Route(start)
+        if isinstance(codes, (bytes, bytearray)):
+            route.codes.frombytes(codes)
+        else:
+            route.codes.extend(codes)
+        return route
 
     # After taking a step we add the direction we moved in
     # @param dir Direction we moved in
     def add(self, dir):
-        self.route.append(dir)
+        self.codes.append(dir.value)
+        self.end = None
         return
 
     # Returns the length of the route
     # @return length of the route
     def size(self):
-        return len(self.route)
+        return len(self.codes)
 
     # Getter for the list of directions
     # @return list of directions
     def get_route(self):
-        return self.route
+        return [DIRECTIONS[code] for code in self.codes]
+
+    # Getter for the direction values
+    # @return array of direction values, one signed byte each
+    def get_codes(self):
+        return self.codes
+
+    # The direction values as numpy array, sharing memory with the route. The array holds on to the memory of the
+    # route: as long as it is alive, add and remove_last raise a BufferError because the route can't grow or shrink.
+    # Copy the array when keeping it around while the route is still being built.
+    # @return int8 array of direction values
+    def to_numpy(self):
+        return np.frombuffer(self.codes, dtype=np.int8)
 
     # Getter for the starting coordinate
     # @return the starting coordinate
     def get_start(self):
         return self.start
 
+    # Getter for the coordinate the route ends at
+    # @return the end coordinate
+    def get_end(self):
+        if self.end is None:
+            # only the amount of steps in each direction matters
+            counts = np.bincount(self.to_numpy(), minlength=4)
+            self.end = Coordinate(self.start.get_x() + int(X_OFFSETS @ counts),
+                                  self.start.get_y() + int(Y_OFFSETS @ counts))
+        return self.end
+
+    # Coordinates of all the positions the route visits after the start
+    # @return tuple of an int array of x coordinates and an int array of y coordinates
+    def get_coordinates(self):
+        codes = self.to_numpy()
+        xs = self.start.get_x() + np.cumsum(X_OFFSETS[codes])
+        ys = self.start.get_y() + np.cumsum(Y_OFFSETS[codes])
+        return xs, ys
+
+    # The same route walked from the end back to the start
+    # @return a new route starting at the end of this one
+    def reversed(self):
+        # the opposite of direction value v is (v + 2) % 4
+        codes = (self.to_numpy()[::-1] + 2) % 4
+        return Route.from_codes(self.get_end(), codes.astype(np.int8).tobytes())
+
+    # This route followed by another route that starts where this one ends
+    # @param other the route to append
+    # @return a new route
+    def concatenate(self, other):
+        if not other.get_start() == self.get_end():
+            raise ValueError("Route starting at " + str(other.get_start()) + " can't follow a route ending at "
+                             + str(self.get_end()))
+        route = Route.from_codes(self.start, self.codes)
+        route.codes.extend(other.codes)
+        return route
+
     def set_route(self, r):
-        self.route = r
-        return self.route
+        self.codes = array("b", [Direction.dir_to_int(dir) for dir in r])
+        self.end = None
+        return r
 
     # Function that checks whether a route is smaller than another route
     # @param other the other route
@@ -46,22 +124,33 @@ class Route:
     # Take a step back in the route and return the last direction
     # @return last direction
     def remove_last(self):
-        return self.route.pop()
+        self.end = None
+        return DIRECTIONS[self.codes.pop()]
 
     # Build a string representing the route as the format specified in the manual.
     # @return string with the specified format of a route
     def __str__(self):
-        string = ""
-        for dir in self.route:
-            string += str(Direction.dir_to_int(dir))
-            string += ";\n"
-        return string
+        return "".join([LINES[code] for code in self.codes])
 
     # Equals method for route
     # @param other Other route
     # @return boolean whether they are equal
     def __eq__(self, other):
-        return self.start == other.start and self.route == other.route
+        return self.start == other.start and self.codes == other.codes
+
+    # Only the start and the direction values are pickled, the end is computed again when needed.
+    def __getstate__(self):
+        return {"start": self.start, "codes": self.codes.tobytes()}
+
+    def __setstate__(self, state):
+        self.start = state["start"]
+        self.codes = array("b")
+        self.end = None
+        if "route" in state:
+            # pickled before routes were stored compactly
+            self.set_route(state["route"])
+        else:
+            self.codes.frombytes(state["codes"])
 
 
     # Method that implements the specified format for writing a route to a file.
@@ -70,7 +159,7 @@ class Route:
     def write_to_file(self, file_path):
         f = open(file_path, "w")
         string = ""
-        string += str(len(self.route))
+        string += str(len(self.codes))
         string += ";\n"
         string += str(self.start)
         string += ";\n"
@@ -0,0 +1,209 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import hashlib
+import sqlite3
+import time
+
+import numpy as np
+from src.PathSpecification import PathSpecification
+from src.Route import Route
+
+# attributes of route finders that change the routes they find, part of their solver key
+SOLVER_PARAMETERS = ("ants_per_gen", "generations", "q", "evaporation", "engine", "deposit_top_k",
+                     "deposit_rank_weighted", "online_loop_erasure")
+
+# Persistent cache of optimized routes, stored in a SQLite file. Routes are keyed by a hash of the maze walls, the
+# name of the solver that found them and the start and end coordinates, and are stored as one byte per direction.
+# The least recently used routes are evicted once the cache grows over its limits. Looking up a route doesn't write
+# to the file: the times routes were last used are kept in memory and written in one transaction when a route is
+# stored, every flush_interval hits and when the cache is closed.
+class RouteCache:
+
+    # Opens (or creates) a route cache.
+    # @param file_path path to the SQLite file.
+    # @param max_entries maximum amount of routes to keep, unlimited if None.
+    # @param max_bytes maximum total amount of stored directions, unlimited if None.
+    # @param flush_interval amount of hits after which the times the routes were last used are written.
+    def __init__(self, file_path, max_entries=None, max_bytes=None, flush_interval=1000):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.connection = None
+        # time every route that was looked up since the last flush was last used, by key
+        self.touched = {}
+
+    # Get the connection to the cache file, opening it when needed.
+    # @return the sqlite3 connection
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.file_path, timeout=30)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS routes ("
+                                    "maze TEXT, solver TEXT, start_x INTEGER, start_y INTEGER, "
+                                    "end_x INTEGER, end_y INTEGER, directions BLOB, size INTEGER, last_used REAL, "
+                                    "PRIMARY KEY (maze, solver, start_x, start_y, end_x, end_y))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS routes_last_used ON routes (last_used)")
+            self.connection.commit()
+        return self.connection
+
+    # Content hash of a maze, the same walls always give the same key.
+    # @param maze the maze.
+    # @return hexadecimal key
+    @staticmethod
+    def maze_key(maze):
+        walls = np.ascontiguousarray(maze.walls, dtype=np.uint8)
+        digest = hashlib.sha1()
+        digest.update(np.array(walls.shape, dtype=np.int64).tobytes())
+        digest.update(walls.tobytes())
+        return digest.hexdigest()
+
+    # Look up a route.
+    # @param maze_key key of the maze, see maze_key.
+    # @param path_specification the path specification of the route.
+    # @param solver key of the solver the route was found with, see solver_key.
+    # @return the cached route, or None if it isn't in the cache
+    def get(self, maze_key, path_specification, solver):
+        key = self.key(maze_key, path_specification, solver)
+        connection = self.connect()
+        row = connection.execute("SELECT directions FROM routes WHERE maze = ? AND solver = ? AND start_x = ? "
+                                 "AND start_y = ? AND end_x = ? AND end_y = ?", key).fetchone()
+        if row is None:
+            return None
+        self.touched[key] = time.time()
+        if len(self.touched) >= self.flush_interval:
+            self.flush()
+
+        return Route.from_codes(path_specification.get_start(), row[0])
+
+    # Store a route, evicting the least recently used routes if the cache is full.
+    # @param maze_key key of the maze, see maze_key.
+    # @param path_specification the path specification of the route.
+    # @param route the route to store.
+    # @param solver key of the solver the route was found with, see solver_key.
+    def put(self, maze_key, path_specification, route, solver):
+        self.put_many(maze_key, [(path_specification, route)], solver)
+
+    # Store a number of routes in one transaction, evicting the least recently used routes if the cache is full.
+    # @param maze_key key of the maze, see maze_key.
+    # @param routes list of tuples of a path specification and the route to store for it.
+    # @param solver key of the solver the routes were found with, see solver_key.
+    def put_many(self, maze_key, routes, solver):
+        now = time.time()
+        rows = []
+        for path_specification, route in routes:
+            directions = route.get_codes().tobytes()
+            rows.append(self.key(maze_key, path_specification, solver) + (directions, len(directions), now))
+        connection = self.connect()
+        # write the hits first, so they count when evicting
+        self.write_touched()
+        connection.executemany("INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.evict()
+        connection.commit()
+
+    # Write the times the routes that were looked up were last used, in one transaction.
+    def flush(self):
+        if len(self.touched) > 0:
+            self.write_touched()
+            self.connect().commit()
+
+    # Write the times the routes that were looked up were last used, without committing.
+    def write_touched(self):
+        if len(self.touched) > 0:
+            self.connect().executemany("UPDATE routes SET last_used = ? WHERE maze = ? AND solver = ? AND start_x = ? "
+                                       "AND start_y = ? AND end_x = ? AND end_y = ?",
+                                       [(used,) + key for key, used in self.touched.items()])
+            self.touched = {}
+
+    # Remove the least recently used routes until the cache is within its limits.
+    def evict(self):
+        connection = self.connect()
+        if self.max_entries is not None:
+            connection.execute("DELETE FROM routes WHERE rowid IN (SELECT rowid FROM routes ORDER BY last_used DESC "
+                               "LIMIT -1 OFFSET ?)", (self.max_entries,))
+        if self.max_bytes is not None:
+            connection.execute("DELETE FROM routes WHERE rowid IN (SELECT rowid FROM (SELECT rowid, SUM(size) "
+                               "OVER (ORDER BY last_used DESC, rowid) AS total FROM routes) WHERE total > ?)",
+                               (self.max_bytes,))
+
+    # Amount of routes in the cache.
+    # @return amount of routes
+    def size(self):
+        return self.connect().execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+
+    # Close the cache file.
+    def close(self):
+        if self.connection is not None:
+            self.flush()
+            self.connection.close()
+            self.connection = None
+
+    # Key of a route finder: its class name and the parameters that change the routes it finds, so routes of
+    # differently configured (or stochastic and exact) finders are never mixed up.
+    # @param finder the route finder.
+    # @return the solver key
+    @staticmethod
+    def solver_key(finder):
+        parameters = ["{}={}".format(name, getattr(finder, name)) for name in SOLVER_PARAMETERS if hasattr(finder, name)]
+        return type(finder).__name__ + "(" + ", ".join(parameters) + ")"
+
+    # Database key of a route.
+    # @return tuple of the key columns
+    @staticmethod
+    def key(maze_key, path_specification, solver):
+        start = path_specification.get_start()
+        end = path_specification.get_end()
+        return maze_key, solver, start.get_x(), start.get_y(), end.get_x(), end.get_y()
+
+    # The connection can't be pickled, a copy of the cache opens its own.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["connection"] = None
+        state["touched"] = {}
+        return state
+
+# Route finder that looks up routes in a RouteCache before asking the wrapped route finder, which can be an
+# AntColonyOptimization or a ShortestPath. It can be passed anywhere those can, for example to TSPData.calculate_routes.
+# It only has find_shortest_routes when the wrapped finder has it, so TSPData only searches many ends at once when the
+# wrapped finder can.
+class CachedRouteFinder:
+
+    # Constructs a new cached route finder.
+    # @param finder the route finder to wrap, must have a maze attribute.
+    # @param cache the RouteCache to use.
+    # @param solver key of the solver, routes of different solvers are cached separately. Derived from the finder by
+    # default, see RouteCache.solver_key.
+    def __init__(self, finder, cache, solver=None):
+        self.finder = finder
+        self.cache = cache
+        self.solver = RouteCache.solver_key(finder) if solver is None else solver
+        self.maze = finder.maze
+        self.maze_key = RouteCache.maze_key(finder.maze)
+        if hasattr(finder, "find_shortest_routes"):
+            self.find_shortest_routes = self.find_cached_routes
+
+    # Find the shortest route, from the cache if it was found before.
+    # @param path_specification the path specification.
+    # @return the route
+    def find_shortest_route(self, path_specification):
+        route = self.cache.get(self.maze_key, path_specification, self.solver)
+        if route is None:
+            route = self.finder.find_shortest_route(path_specification)
+            self.cache.put(self.maze_key, path_specification, route, self.solver)
+        return route
+
+    # Find the shortest routes from one start to a list of ends, from the cache where they were found before. The
+    # other ends are searched by the wrapped finder at once. Used as find_shortest_routes.
+    # @param start the start coordinate.
+    # @param ends list of end coordinates.
+    # @return list with the shortest route to each of the ends
+    def find_cached_routes(self, start, ends):
+        specs = [PathSpecification(start, end) for end in ends]
+        routes = [self.cache.get(self.maze_key, spec, self.solver) for spec in specs]
+        missing = [i for i, route in enumerate(routes) if route is None]
+        if len(missing) > 0:
+            found = self.finder.find_shortest_routes(start, [ends[i] for i in missing])
+            for i, route in zip(missing, found):
+                routes[i] = route
+            self.cache.put_many(self.maze_key, [(specs[i], routes[i]) for i in missing], self.solver)
+        return routes
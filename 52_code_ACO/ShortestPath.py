@@ -0,0 +1,97 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import heapq
+from collections import deque
+
+from src.Coordinate import Coordinate
+from src.Route import Route
+
+# Exact shortest paths in a maze. The maze is an unweighted 4-connected grid, so breadth first search (or A* with the
+# manhattan distance as heuristic) finds the true shortest route. Has the same find_shortest_route interface as
+# AntColonyOptimization, so it can be used to build TSPData or to check the routes found by the ants.
+class ShortestPath:
+
+    # Constructs a new shortest path finder.
+    # @param maze the maze to find routes in.
+    def __init__(self, maze):
+        self.maze = maze
+        self.length = maze.get_length()
+        self.neighbours = maze.get_neighbour_list()
+
+    # Find the shortest route between the start and end of a path specification with A*.
+    # @param path_specification the path specification.
+    # @return the shortest route
+    def find_shortest_route(self, path_specification):
+        start = path_specification.get_start()
+        end = path_specification.get_end()
+        start_id = self.cell_id(start)
+        end_id = self.cell_id(end)
+        end_x = end.get_x()
+        end_y = end.get_y()
+
+        came_from = {start_id: -1}
+        cost = {start_id: 0}
+        closed = set()
+        queue = [(0, start_id)]
+        while len(queue) > 0:
+            _, cell = heapq.heappop(queue)
+            if cell == end_id:
+                return self.build_route(start, end_id, came_from)
+            if cell in closed:
+                continue
+            closed.add(cell)
+            for dir, neighbour in enumerate(self.neighbours[cell]):
+                new_cost = cost[cell] + 1
+                if neighbour < 0 or cost.get(neighbour, sys.maxsize) <= new_cost:
+                    continue
+                cost[neighbour] = new_cost
+                came_from[neighbour] = dir
+                x, y = divmod(neighbour, self.length)
+                heapq.heappush(queue, (new_cost + abs(x - end_x) + abs(y - end_y), neighbour))
+        raise ValueError("No route from " + str(start) + " to " + str(end))
+
+    # Find the shortest routes from one start to a list of ends with a single breadth first search.
+    # @param start the start coordinate.
+    # @param ends list of end coordinates.
+    # @return list with the shortest route to each of the ends
+    def find_shortest_routes(self, start, ends):
+        start_id = self.cell_id(start)
+        remaining = set(self.cell_id(end) for end in ends)
+        remaining.discard(start_id)
+
+        came_from = {start_id: -1}
+        queue = deque([start_id])
+        while len(queue) > 0 and len(remaining) > 0:
+            cell = queue.popleft()
+            for dir, neighbour in enumerate(self.neighbours[cell]):
+                if neighbour < 0 or neighbour in came_from:
+                    continue
+                came_from[neighbour] = dir
+                remaining.discard(neighbour)
+                queue.append(neighbour)
+
+        if len(remaining) > 0:
+            unreachable = Coordinate(*divmod(remaining.pop(), self.length))
+            raise ValueError("No route from " + str(start) + " to " + str(unreachable))
+        return [self.build_route(start, self.cell_id(end), came_from) for end in ends]
+
+    # Follow the search tree back from the end to the start.
+    # @param start the start coordinate.
+    # @param end_id cell id of the end.
+    # @param came_from map from cell id to the direction value that was taken to reach it (-1 for the start).
+    # @return the route from start to end
+    def build_route(self, start, end_id, came_from):
+        codes = []
+        cell = end_id
+        while came_from[cell] >= 0:
+            dir = came_from[cell]
+            codes.append(dir)
+            cell = self.neighbours[cell][(dir + 2) % 4]
+        return Route.from_codes(start, codes[::-1])
+
+    # Cell id of a coordinate, the index in the flattened pheromone grid.
+    # @param coordinate the coordinate.
+    # @return the cell id
+    def cell_id(self, coordinate):
+        return self.maze.cell_id(coordinate)
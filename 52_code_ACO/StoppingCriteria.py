@@ -0,0 +1,140 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import math
+import time
+
+import numpy as np
+
+# Stopping criteria of the optimizers. AntColonyOptimization and GeneticAlgorithm take a list of criteria, check them
+# after every generation and stop at the first one that is met, reporting its reason in their stop_reason. Criteria
+# keep state of the run they are checking, they are reset at the start of every run.
+
+# State of a run after a generation, as seen by the stopping criteria.
+class SearchState:
+
+    # Constructs a new search state.
+    # @param generation amount of generations done.
+    # @param best_length length of the best route or tour found so far.
+    # @param maze the maze with the pheromones of an ant colony optimization, None for a genetic algorithm.
+    # @param population the population of a genetic algorithm, None for an ant colony optimization.
+    def __init__(self, generation, best_length, maze=None, population=None):
+        self.generation = generation
+        self.best_length = best_length
+        self.maze = maze
+        self.population = population
+
+# Stop when the best length hasn't improved for a number of generations.
+class Stagnation:
+    reason = "stagnation"
+
+    # @param window amount of generations without improvement after which to stop.
+    def __init__(self, window):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.best_length = None
+        self.stagnant = 0
+
+    def should_stop(self, state):
+        if self.best_length is None or state.best_length < self.best_length:
+            self.best_length = state.best_length
+            self.stagnant = 0
+        else:
+            self.stagnant += 1
+        return self.stagnant >= self.window
+
+# Stop when a run takes longer than a time budget. The generation that is running when the budget runs out is finished.
+class TimeBudget:
+    reason = "time_budget"
+
+    # @param seconds the time budget of a run.
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.reset()
+
+    def reset(self):
+        self.start = time.perf_counter()
+
+    def should_stop(self, state):
+        return time.perf_counter() - self.start >= self.seconds
+
+# Stop when a route or tour of at most a target length is found.
+class TargetLength:
+    reason = "target_length"
+
+    # @param length the target length.
+    def __init__(self, length):
+        self.length = length
+
+    def reset(self):
+        pass
+
+    def should_stop(self, state):
+        return state.best_length <= self.length
+
+# Stop when the pheromones have converged: the entropy of the pheromone distribution over the open cells, relative to
+# the entropy of a uniform distribution, drops below a threshold. Only applies to ant colony optimization.
+class PheromoneEntropy:
+    reason = "pheromone_entropy"
+
+    # @param threshold relative entropy between 0 (all pheromone on one cell) and 1 (uniform) to stop below.
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def reset(self):
+        pass
+
+    def should_stop(self, state):
+        if state.maze is None:
+            return False
+        return PheromoneEntropy.relative_entropy(state.maze) < self.threshold
+
+    # Entropy of the pheromone distribution over the open cells of a maze, relative to a uniform distribution.
+    # @param maze the maze.
+    # @return the relative entropy, between 0 and 1
+    @staticmethod
+    def relative_entropy(maze):
+        pheromones = np.asarray(maze.pheromones).ravel()[maze.open_cells]
+        if len(pheromones) < 2:
+            return 0.0
+        p = pheromones / pheromones.sum()
+        p = p[p > 0]
+        return float(-(p * np.log(p)).sum() / math.log(len(pheromones)))
+
+# Stop when the population has converged: the part of the chromosomes that are distinct drops below a threshold. Only
+# applies to genetic algorithms.
+class PopulationDiversity:
+    reason = "population_diversity"
+
+    # @param threshold fraction of distinct chromosomes to stop below.
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def reset(self):
+        pass
+
+    def should_stop(self, state):
+        if state.population is None:
+            return False
+        distinct = len(np.unique(state.population, axis=0))
+        return distinct / len(state.population) < self.threshold
+
+# Reset a list of criteria for a new run.
+# @param criteria list of stopping criteria.
+def reset_all(criteria):
+    for criterion in criteria:
+        criterion.reset()
+
+# Check a list of criteria. Every criterion is checked, so criteria that track the run (such as Stagnation) see every
+# generation.
+# @param criteria list of stopping criteria.
+# @param state the SearchState after the last generation.
+# @return the reason of the first criterion that is met, or None to go on
+def check_all(criteria, state):
+    reason = None
+    for criterion in criteria:
+        if criterion.should_stop(state) and reason is None:
+            reason = criterion.reason
+    return reason
@@ -5,6 +5,7 @@ from src.Direction import Direction
 
 # Class containing the pheromone information around a certain point in the maze
 class SurroundingPheromone:
+    __slots__ = ("north", "south", "west", "east", "total_surrounding_pheromone")
 
     # Creates a surrounding pheromone object.
     # @param north the amount of pheromone in the north.
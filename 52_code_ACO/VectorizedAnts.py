@@ -0,0 +1,118 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.RandomStreams import make_generator
+from src.Route import Route
+
+# Class that advances a whole generation of ants through the maze at once. Positions are kept as integer cell ids
+# (x * length + y, the flattened index of Maze.pheromones, see Maze.build_index) and every step is a handful of array
+# operations over all ants that have not reached the end yet. The transition rule is the same as the one in Ant.find_route.
+# Every step costs a few numpy calls whatever the amount of ants, so this only beats letting the ants walk one by one
+# when a generation has many ants, see AntColonyOptimization.
+class VectorizedAnts:
+
+    # Constructs a new generation of ants.
+    # @param maze Maze the ants will be running in.
+    # @param path_specification The path specification consisting of a start coordinate and an end coordinate.
+    # @param ants amount of ants in the generation.
+    # @param rng seed or numpy Generator of the generation, see RandomStreams.make_generator.
+    def __init__(self, maze, path_specification, ants, rng=None):
+        self.maze = maze
+        self.start = path_specification.get_start()
+        self.end = path_specification.get_end()
+        self.ants = ants
+        self.neighbours = maze.neighbours
+        self.rng = make_generator(rng)
+        # total amount of steps of all ants in the last walk, including the ones that were erased as loops
+        self.steps = 0
+
+    # Let all ants of the generation walk from the start to the end.
+    # @return a list with the (loop free) route of every ant.
+    def find_routes(self):
+        start_id = self.maze.cell_id(self.start)
+        end_id = self.maze.cell_id(self.end)
+        cumulative, next_state = self.transitions(self.maze.pheromones.ravel())
+        at_end = np.zeros(len(cumulative), dtype=bool)
+        at_end[end_id * 5:end_id * 5 + 5] = True
+
+        # the states of the ants that have not reached the end yet, and which ants they are
+        states = np.full(self.ants if start_id != end_id else 0, start_id * 5, dtype=np.int64)
+        ants = np.arange(len(states), dtype=self.ant_dtype())
+        step_states = []
+        step_ants = []
+
+        while len(states) > 0:
+            # roulette wheel selection of a direction for every ant at once
+            weights = cumulative[states]
+            draws = self.rng.random(len(states)) * weights[:, -1]
+            directions = (weights <= draws[:, None]).sum(axis=1)
+
+            states = next_state[states, directions]
+            step_states.append(states)
+            step_ants.append(ants)
+            arrived = at_end[states]
+            if arrived.any():
+                states = states[~arrived]
+                ants = ants[~arrived]
+
+        # regroup the steps per ant, in the order they were taken
+        walked_cells = [[start_id] for _ in range(self.ants)]
+        walked_directions = [[] for _ in range(self.ants)]
+        self.steps = sum(len(ants) for ants in step_ants)
+        if len(step_ants) > 0:
+            all_ants = np.concatenate(step_ants)
+            order = np.argsort(all_ants, kind="stable")
+            all_states = np.concatenate(step_states)[order]
+            bounds = np.searchsorted(all_ants[order], np.arange(self.ants + 1))
+            all_cells = (all_states // 5).tolist()
+            all_directions = (all_states % 5 - 1).tolist()
+            for a in range(self.ants):
+                walked_cells[a].extend(all_cells[bounds[a]:bounds[a + 1]])
+                walked_directions[a] = all_directions[bounds[a]:bounds[a + 1]]
+
+        return [self.erase_loops(walked_cells[a], walked_directions[a], end_id) for a in range(self.ants)]
+
+    # Transition rule of the ants as tables over states. The state of an ant is its cell id and the direction value it
+    # took to get there, cell * 5 + direction + 1 (+ 0 before the first step). The pheromones don't change during a
+    # walk, so every step only has to look up the state of every ant.
+    # @param pheromones the flattened pheromone grid.
+    # @return tuple of the cumulative weights of the 4 directions of every state, and the state reached by taking each
+    # direction from every state
+    def transitions(self, pheromones):
+        cells = len(self.neighbours)
+        weights = np.where(self.neighbours >= 0, pheromones[np.maximum(self.neighbours, 0)], 0.0)
+        weights = np.repeat(weights[:, None, :], 5, axis=1)
+
+        # don't let an ant go back where it came from, unless it is standing in a dead end
+        for dir in range(4):
+            back = (dir + 2) % 4
+            arrived = weights[:, dir + 1]
+            forward_possible = arrived.sum(axis=1) - arrived[:, back] > 0
+            arrived[forward_possible, back] = 0.0
+
+        next_state = np.repeat(self.neighbours * 5 + np.arange(1, 5), 5, axis=0)
+        return np.cumsum(weights, axis=2).reshape(cells * 5, 4), next_state
+
+    # Smallest integer type that holds the index of every ant, numpy sorts these with a radix sort.
+    # @return numpy dtype
+    def ant_dtype(self):
+        return np.int16 if self.ants <= np.iinfo(np.int16).max else np.int64
+
+    # Remove loops from a walk by jumping to the last visit of every kept cell.
+    # @param cells cell ids visited by the ant, starting with the start cell.
+    # @param directions direction values taken by the ant, one less than cells.
+    # @param end_id cell id of the end position.
+    # @return loop free route
+    def erase_loops(self, cells, directions, end_id):
+        last_visit = {}
+        for index, cell in enumerate(cells):
+            last_visit[cell] = index
+
+        codes = []
+        index = 0
+        while cells[index] != end_id:
+            index = last_visit[cells[index]]
+            codes.append(directions[index])
+            index += 1
+        return Route.from_codes(self.start, codes)
@@ -0,0 +1,68 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import itertools
+import unittest
+
+import numpy as np
+from src.Coordinate import Coordinate
+from src.Maze import Maze
+from src.MazePruner import MazePruner
+from src.PathSpecification import PathSpecification
+from src.ShortestPath import ShortestPath
+
+# Maze with loops, corridors and dead ends (some of them nested) drawn row by row, "#" is a wall.
+LAYOUT = [
+    "...#.....#.",
+    ".#.#.###.#.",
+    ".#...#...#.",
+    ".####.####.",
+    "...........",
+    ".#.##.#.##.",
+    ".#.#..#..#.",
+    "...#.###.#.",
+]
+
+# Checks that pruning a maze doesn't change the shortest distances between the cells that are kept.
+class MazePrunerTest(unittest.TestCase):
+
+    def setUp(self):
+        walls = (np.array([[c == "." for c in row] for row in LAYOUT], dtype=np.uint8)).T.copy()
+        self.maze = Maze(walls, len(walls), len(walls[0]))
+        self.keep = [Coordinate(0, 0), Coordinate(10, 7), Coordinate(4, 0), Coordinate(7, 6), Coordinate(2, 6)]
+
+    # Check that a route only visits open cells of a maze and ends where it should.
+    def assert_walkable(self, maze, route, spec):
+        xs, ys = route.get_coordinates()
+        self.assertTrue(np.asarray(maze.walls)[xs, ys].all())
+        self.assertEqual(route.get_end(), spec.get_end())
+
+    def test_fill_dead_ends(self):
+        pruned = MazePruner.fill_dead_ends(self.maze, self.keep)
+        self.assertLess(pruned.open_cells.sum(), self.maze.open_cells.sum())
+        kept = [self.maze.cell_id(c) for c in self.keep]
+        self.assertTrue(pruned.open_cells[kept].all())
+        # the only dead ends left are kept cells
+        self.assertEqual(set(np.flatnonzero(pruned.dead_ends).tolist()) - set(kept), set())
+
+    def test_distances(self):
+        pruned = MazePruner.fill_dead_ends(self.maze, self.keep)
+        graph = MazePruner.contract_corridors(pruned, self.keep)
+        self.assertLess(len(graph.nodes), pruned.open_cells.sum())
+        for start, end in itertools.permutations(self.keep, 2):
+            spec = PathSpecification(start, end)
+            expected = ShortestPath(self.maze).find_shortest_route(spec).size()
+            route = ShortestPath(pruned).find_shortest_route(spec)
+            self.assertEqual(route.size(), expected, spec)
+            self.assert_walkable(pruned, route, spec)
+            route = graph.find_shortest_route(spec)
+            self.assertEqual(route.size(), expected, spec)
+            self.assert_walkable(pruned, route, spec)
+
+    def test_unkept_node(self):
+        graph = MazePruner.contract_corridors(MazePruner.fill_dead_ends(self.maze, self.keep), self.keep)
+        with self.assertRaises(ValueError):
+            graph.find_shortest_route(PathSpecification(Coordinate(0, 0), Coordinate(0, 3)))
+
+if __name__ == "__main__":
+    unittest.main()
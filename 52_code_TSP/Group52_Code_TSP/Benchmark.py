@@ -0,0 +1,222 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import argparse
+import json
+import platform
+import statistics
+import time
+
+import numpy as np
+from src.Ant import Ant
+from src.AntColonyOptimization import AntColonyOptimization
+from src.Coordinate import Coordinate
+from src.CostModel import CostModel
+from src.GeneticAlgorithm import GeneticAlgorithm
+from src.Maze import Maze
+from src.PathSpecification import PathSpecification
+from src.RandomStreams import make_generator
+from src.ShortestPath import ShortestPath
+from src.TSPData import TSPData
+from src.VectorizedAnts import VectorizedAnts
+
+# Reproducible benchmarks of the ACO and GA hot paths on generated problems. Every benchmark is timed a number of
+# times, with a random generator seeded the same way for every run, and the results are written as JSON so runs
+# of different versions can be compared.
+
+# Generate a maze: a random spanning tree of corridors between the cells with even coordinates (so every open cell
+# can reach every other one), after which walls are knocked out at random to add loops.
+# @param width width of the maze.
+# @param length length of the maze.
+# @param density chance that a wall of the spanning tree stays a wall, 1 gives a maze without loops.
+# @param seed seed of the maze.
+# @return the maze
+def generate_maze(width, length, density, seed):
+    rng = make_generator(seed)
+    walls = np.zeros((width, length), dtype=np.uint8)
+    walls[0, 0] = 1
+    stack = [(0, 0)]
+    while len(stack) > 0:
+        x, y = stack[-1]
+        options = [(dx, dy) for dx, dy in ((2, 0), (0, -2), (-2, 0), (0, 2))
+                   if 0 <= x + dx < width and 0 <= y + dy < length and walls[x + dx, y + dy] == 0]
+        if len(options) == 0:
+            stack.pop()
+            continue
+        dx, dy = options[rng.integers(len(options))]
+        walls[x + dx // 2, y + dy // 2] = 1
+        walls[x + dx, y + dy] = 1
+        stack.append((x + dx, y + dy))
+
+    walls[rng.random((width, length)) >= density] = 1
+    return Maze(walls, width, length)
+
+# Path specification from the top left to the bottom right open corner of a generated maze.
+# @param maze a generated maze.
+# @return the path specification
+def corner_specification(maze):
+    end = Coordinate((maze.get_width() - 1) // 2 * 2, (maze.get_length() - 1) // 2 * 2)
+    return PathSpecification(Coordinate(0, 0), end)
+
+# Pick random product locations among the open cells of a maze, never the start or end.
+# @param maze the maze.
+# @param spec the path specification.
+# @param count amount of products.
+# @param seed seed of the products.
+# @return list of product coordinates
+def generate_products(maze, spec, count, seed):
+    rng = make_generator(seed)
+    excluded = {maze.cell_id(spec.get_start()), maze.cell_id(spec.get_end())}
+    cells = [cell for cell in np.flatnonzero(maze.open_cells).tolist() if cell not in excluded]
+    chosen = rng.choice(len(cells), size=min(count, len(cells)), replace=False)
+    return [Coordinate(cells[i] // maze.get_length(), cells[i] % maze.get_length()) for i in chosen]
+
+# Time a function.
+# @param name name of the benchmark.
+# @param function function to time, called with a new random generator made from the seed for every run.
+# @param repeat amount of runs.
+# @param seed seed of the random generator.
+# @param setup function without arguments that is called (untimed) before every run, if any.
+# @return dict with the timings in seconds
+def measure(name, function, repeat, seed, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        rng = make_generator(seed)
+        start = time.perf_counter()
+        function(rng)
+        times.append(time.perf_counter() - start)
+    return {"name": name, "repeat": repeat, "min": min(times), "mean": statistics.mean(times),
+            "median": statistics.median(times)}
+
+# Run the benchmarks.
+# @param args the parsed command line arguments.
+# @return dict with the configuration, the environment and the results
+def run(args):
+    maze = generate_maze(args.width, args.length, args.density, args.seed)
+    spec = corner_specification(maze)
+    products = generate_products(maze, spec, args.products, args.seed)
+
+    # routes of a single generation to deposit, walked on the initial pheromones
+    maze.reset()
+    routes = VectorizedAnts(maze, spec, args.ants, args.seed).find_routes()
+
+    # the exact distances between the products, used by the GA benchmarks
+    tsp_data = TSPData(products, spec)
+    tsp_data.calculate_routes(ShortestPath(maze))
+    cost_model = CostModel.from_tsp_data(tsp_data)
+    ga = GeneticAlgorithm(args.generations, args.population, len(products), max(1, args.population // 100))
+    rng = make_generator(args.seed)
+    population = np.array([rng.permutation(len(products)) for _ in range(args.population)])
+    probabilities = ga.normalize(ga.distances_to_fitness(ga.population_distances(population, cost_model)))
+
+    def find_route(rng):
+        for _ in range(args.ants):
+            Ant(maze, spec, rng=rng).find_route()
+
+    def evaporate(rng):
+        for _ in range(args.iterations):
+            maze.evaporate(args.evaporation)
+
+    def add_pheromone_routes(rng):
+        for _ in range(args.iterations):
+            maze.add_pheromone_routes(routes, args.q)
+
+    def calculate_routes_aco(rng):
+        aco = AntColonyOptimization(maze, args.ants, args.aco_generations, args.q, args.evaporation,
+                                    engine=args.engine, seed=rng)
+        TSPData(products[:args.aco_products], spec).calculate_routes(aco, symmetric=True)
+
+    def fitness(rng):
+        for _ in range(args.iterations):
+            ga.distances_to_fitness(ga.population_distances(population, cost_model))
+
+    def cross_over(rng):
+        ga.rng = rng
+        for i in range(len(population) - 1):
+            ga.cross_over(population[i], population[i + 1])
+
+    def cross_over_population(rng):
+        ga.rng = rng
+        ga.cross_over_population(population[:-1], population[1:])
+
+    def pick(rng):
+        ga.rng = rng
+        for _ in range(len(population)):
+            ga.pick(probabilities)
+
+    def solve_aco(rng):
+        aco = AntColonyOptimization(maze, args.ants, args.aco_generations, args.q, args.evaporation,
+                                    engine=args.engine, seed=rng)
+        aco.find_shortest_route(spec)
+
+    def solve_ga(rng):
+        GeneticAlgorithm(args.generations, args.population, len(products), max(1, args.population // 100),
+                         seed=rng).solve_tsp(cost_model)
+
+    # the benchmarks that use the pheromones of the maze start every run from the initial pheromones
+    benchmarks = [
+        ("ant.find_route", find_route, maze.reset),
+        ("ant.vectorized", lambda rng: VectorizedAnts(maze, spec, args.ants, rng).find_routes(), maze.reset),
+        ("maze.evaporate", evaporate, maze.reset),
+        ("maze.add_pheromone_routes", add_pheromone_routes, maze.reset),
+        ("tsp.calculate_routes.shortest_path", lambda rng: TSPData(products, spec).calculate_routes(ShortestPath(maze)),
+         None),
+        ("tsp.calculate_routes.aco", calculate_routes_aco, None),
+        ("ga.fitness", fitness, None),
+        ("ga.cross_over", cross_over, None),
+        ("ga.cross_over_population", cross_over_population, None),
+        ("ga.pick", pick, None),
+        ("aco.solve", solve_aco, None),
+        ("ga.solve", solve_ga, None),
+    ]
+
+    results = []
+    for name, function, setup in benchmarks:
+        if args.only is not None and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        results.append(measure(name, function, args.repeat, args.seed, setup))
+
+    return {
+        "config": vars(args),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__,
+                        "machine": platform.machine(), "system": platform.system()},
+        "maze": {"open_cells": int(maze.open_cells.sum()), "products": len(products)},
+        "results": results,
+    }
+
+# Parse the command line arguments.
+# @param argv the arguments, the ones of the process if None.
+# @return the parsed arguments
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ACO and GA hot paths on generated problems.")
+    parser.add_argument("--width", type=int, default=41, help="width of the generated maze")
+    parser.add_argument("--length", type=int, default=41, help="length of the generated maze")
+    parser.add_argument("--density", type=float, default=0.9,
+                        help="chance that a wall of the generated maze stays a wall, 1 for a maze without loops")
+    parser.add_argument("--products", type=int, default=20, help="amount of generated products")
+    parser.add_argument("--seed", type=int, default=52, help="seed of the generated problem and of every run")
+    parser.add_argument("--repeat", type=int, default=5, help="amount of runs of every benchmark")
+    parser.add_argument("--iterations", type=int, default=100, help="calls per run of the cheap benchmarks")
+    parser.add_argument("--ants", type=int, default=10, help="ants per generation")
+    parser.add_argument("--aco-generations", type=int, default=3, help="generations of the ACO solves")
+    parser.add_argument("--aco-products", type=int, default=4,
+                        help="amount of the products whose routes are calculated with ACO, every route is a full solve")
+    parser.add_argument("--q", type=float, default=1000, help="pheromone normalization factor")
+    parser.add_argument("--evaporation", type=float, default=0.1, help="evaporation factor")
+    parser.add_argument("--engine", choices=("ant", "vectorized"), default="ant", help="engine of the ACO solves")
+    parser.add_argument("--population", type=int, default=500, help="population size of the GA")
+    parser.add_argument("--generations", type=int, default=50, help="generations of the GA solve")
+    parser.add_argument("--only", nargs="*", default=None, help="only run benchmarks whose name starts with these")
+    parser.add_argument("--output", default=None, help="file to write the JSON results to, stdout by default")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = run(args)
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
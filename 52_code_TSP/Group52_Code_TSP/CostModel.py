@@ -0,0 +1,71 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+
+# Cost of a full tour through the products: from the start to the first product, between the products, from the last
+# product to the end, plus the cost of picking every product. All distances are kept in one (N+2)x(N+2) integer
+# matrix where index N is the start and index N+1 is the end, so the cost of a product sequence is a single gather.
+class CostModel:
+
+    # Constructs a new cost model.
+    # @param matrix (N+2)x(N+2) distance matrix, the last two indices are the start and the end.
+    # @param pick_cost cost of picking up a single product.
+    def __init__(self, matrix, pick_cost=0):
+        self.matrix = np.asarray(matrix, dtype=np.int64)
+        self.num_points = len(self.matrix) - 2
+        self.start = self.num_points
+        self.end = self.num_points + 1
+        self.pick_cost = pick_cost
+
+    # Build the cost model of the route that is actually walked, as written by TSPData.write_action_file.
+    # @param tsp_data TSPData with calculated routes.
+    # @return the cost model
+    @staticmethod
+    def from_tsp_data(tsp_data):
+        n = len(tsp_data.get_distances())
+        matrix = np.zeros((n + 2, n + 2), dtype=np.int64)
+        matrix[:n, :n] = tsp_data.get_distances()
+        matrix[n, :n] = tsp_data.get_start_distances()
+        matrix[:n, n + 1] = tsp_data.get_end_distances()
+        # taking a product costs one action
+        return CostModel(matrix, pick_cost=1)
+
+    # Build a cost model of only the product to product distances, the start and end legs cost nothing.
+    # @param distances NxN distance matrix between the products.
+    # @return the cost model
+    @staticmethod
+    def from_matrix(distances):
+        distances = np.asarray(distances)
+        n = len(distances)
+        matrix = np.zeros((n + 2, n + 2), dtype=np.int64)
+        matrix[:n, :n] = distances
+        return CostModel(matrix)
+
+    # Use a cost model as is, or build one from a product to product distance matrix.
+    # @param tsp_data a CostModel or an NxN distance matrix.
+    # @return the cost model
+    @staticmethod
+    def of(tsp_data):
+        if isinstance(tsp_data, CostModel):
+            return tsp_data
+        return CostModel.from_matrix(tsp_data)
+
+    # Cost of every product sequence in a population.
+    # @param population int array with a product sequence per row.
+    # @return array with the cost of each sequence
+    def tour_costs(self, population):
+        population = np.asarray(population)
+        m = self.matrix
+        return m[self.start, population[:, 0]] + m[population[:, :-1], population[:, 1:]].sum(axis=1) \
+               + m[population[:, -1], self.end] + self.pick_cost * population.shape[1]
+
+    # Cost of a single product sequence.
+    # @param tour the product sequence.
+    # @return the cost
+    def tour_cost(self, tour):
+        return self.tour_costs(np.asarray(tour)[None, :])[0]
+
+    # Amount of products.
+    def __len__(self):
+        return self.num_points
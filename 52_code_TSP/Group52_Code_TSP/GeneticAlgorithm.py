@@ -1,8 +1,14 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
+import logging
 import numpy as np
-import random
+from src.CostModel import CostModel
+from src.LocalSearch import LocalSearch
+from src.Metrics import Metrics, LoggingSink
+from src.RandomStreams import make_generator
+from src.StoppingCriteria import SearchState, check_all, reset_all
+from src.Selection import RouletteSelection
 from src.TSPData import TSPData
 
 # TSP problem solver using genetic algorithms.
@@ -13,50 +19,104 @@ class GeneticAlgorithm:
     # @param popSize the population size.
     # @param num_points number of points to vist
     # @param num_elite number of chromosomes that make up the elite
-    def __init__(self, generations, pop_size, num_points, num_elite):
+    # @param selection parent selection strategy from Selection, roulette wheel selection by default
+    # @param memetic None, or "elite"/"offspring" to improve the elite/the children of every generation with LocalSearch
+    # @param metrics Metrics that get a record of every generation, disabled by default.
+    # @param seed seed or numpy Generator of the algorithm, see RandomStreams.make_generator.
+    # @param stopping list of criteria from StoppingCriteria to stop before the last generation, see evolve.
+    def __init__(self, generations, pop_size, num_points, num_elite, selection=None, memetic=None, metrics=None,
+                 seed=None, stopping=None):
+        if memetic not in (None, "elite", "offspring"):
+            raise ValueError("Unknown memetic stage: " + str(memetic))
         self.generations = generations
         self.pop_size = pop_size
         self.best_fit = sys.maxsize
-        self.best_path = np.empty(num_points)
+        self.best_path = np.empty(num_points, dtype=int)
         self.num_elite = num_elite
+        if selection is None:
+            selection = RouletteSelection()
+        self.selection = selection
+        self.memetic = memetic
+        self.metrics = Metrics() if metrics is None else metrics
+        self.rng = make_generator(seed)
+        self.stopping = [] if stopping is None else stopping
+        # why the last call of evolve stopped
+        self.stop_reason = None
 
      # Knuth-Yates shuffle, reordering a array randomly
      # @param chromosome array to shuffle.
     def shuffle(self, chromosome):
         n = len(chromosome)
+        draws = self.rng.random(n)
         for i in range(n):
-            r = i + int(random.uniform(0, 1) * (n - i))
+            r = i + int(draws[i] * (n - i))
             swap = chromosome[r]
             chromosome[r] = chromosome[i]
             chromosome[i] = swap
         return chromosome
 
     # This method should solve the TSP.
-    # @param pd the TSP data.
+    # @param pd the TSP data, a CostModel or a product to product distance matrix.
     # @return the optimized product sequence.
     def solve_tsp(self, tsp_data):
+        population = self.initial_population(len(tsp_data))
+        self.evolve(population, tsp_data, self.generations)
+
+        # Return the best path we have found
+        return self.best_path
+
+    # Make an initial population where each chromosome is the list of all the points shuffled
+    # @param num_points number of points to visit.
+    # @return int array with a chromosome per row
+    def initial_population(self, num_points):
         # List out all the points
-        bist = list(range(0, len(tsp_data)))
+        bist = list(range(0, num_points))
 
         # Make initial population
-        population = np.empty((self.pop_size, len(bist)))
+        population = np.empty((self.pop_size, len(bist)), dtype=int)
         # Each chromosome is the list of all the points shuffled
         for i in range ((self.pop_size)):
             chromosome = self.shuffle(bist)
             population[i] = chromosome
+        return population
+
+    # Evolve a population for a number of generations, keeping track of the best path seen. Every generation emits a
+    # "ga_generation" record with the best_length so far and the seconds spent on fitness (fitness_time), selection
+    # (selection_time), crossover (crossover_time) and mutation and local search of the offspring (offspring_time).
+    # Evolving stops after all generations ("generations") or when one of the stopping criteria is met right after the
+    # fitness of a generation is known (its reason), the reason is kept in stop_reason.
+    # @param population int array with a chromosome per row.
+    # @param tsp_data a CostModel or the distance matrix between the points.
+    # @param generations amount of generations to evolve.
+    # @return the last population
+    def evolve(self, population, tsp_data, generations):
+        tsp_data = CostModel.of(tsp_data)
+        num_points = population.shape[1]
+        local_search = None
+        if self.memetic is not None:
+            local_search = LocalSearch(tsp_data)
 
+        self.stop_reason = "generations"
+        reset_all(self.stopping)
         count = 0
         # Loop over all the generations
-        while count < self.generations:
+        while count < generations:
             count += 1
 
-            # Calculate the fitness for all the chromosomes in the population
-            fitness = np.zeros(self.pop_size)
-            for (i, p) in enumerate(population):
-                fitness[i] = self.fitness(p, tsp_data)
+            with self.metrics.timer("fitness_time"):
+                # Calculate the fitness for all the chromosomes in the population
+                distances = self.population_distances(population, tsp_data)
+                self.update_best(population, distances)
+                fitness = self.distances_to_fitness(distances)
 
-            # Normalize the fitness so that it is a probability of picking a chromosome
-            normalized_fitness = self.normalize(fitness)
+                # Normalize the fitness so that it is a probability of picking a chromosome
+                normalized_fitness = self.normalize(fitness)
+
+            reason = check_all(self.stopping, SearchState(count, self.best_fit, population=population))
+            if reason is not None:
+                self.stop_reason = reason
+                self.metrics.emit("ga_generation", generation=count, best_length=self.best_fit)
+                break
             #print(normalized_fitness, np.sum(normalized_fitness))
 
             # Get the elite of the population
@@ -64,50 +124,52 @@ class GeneticAlgorithm:
             elite = population[elite_indices]
 
             # Next generation
-            new_population = np.empty((self.pop_size - self.num_elite, len(bist)))
-            # Loop to find the next generation that isn't the elite
-            for i in range(self.pop_size - self.num_elite):
-                # Get index of both parents according to their probabilities
-                i1 = self.pick(normalized_fitness) - 1
-                i2 = self.pick(normalized_fitness) - 1
-                # Get the two parent chromosomes (can be the same chromosome)
-                p1 = population[i1]
-                p2 = population[i2]
-                #print("p1: {} p2: {}".format(p1, p2))
-
-                # Crossover between both parents
-                child_cross = self.cross_over(p1, p2)
-                #print("After crossover: {}".format(child_cross))
-
-                # Mutation with rate 0.01
-                mutation_rate = 0.01
-                child = self.mutation(child_cross, mutation_rate)
-                #print("After mutation: {}".format(child))
-
-                # Add result to the new population
-                new_population[i] = child
+            new_population = np.empty((self.pop_size - self.num_elite, num_points), dtype=int)
+            # Get index of both parents of every child according to their probabilities
+            num_children = self.pop_size - self.num_elite
+            with self.metrics.timer("selection_time"):
+                parents = self.selection.select(normalized_fitness, 2 * num_children, self.rng)
+            i1 = parents[:num_children]
+            i2 = parents[num_children:]
+
+            # Crossover between both parents (can be the same chromosome) for all children at once
+            with self.metrics.timer("crossover_time"):
+                children = self.cross_over_population(population[i1], population[i2])
+
+            with self.metrics.timer("offspring_time"):
+                # Loop to find the next generation that isn't the elite
+                for i in range(num_children):
+                    # Mutation with rate 0.01
+                    mutation_rate = 0.01
+                    child = self.mutation(children[i], mutation_rate)
+                    #print("After mutation: {}".format(child))
+
+                    # Optionally improve the child with local search
+                    if self.memetic == "offspring":
+                        child = local_search.improve(child)
+
+                    # Add result to the new population
+                    new_population[i] = child
+
+                # Optionally improve the elite with local search
+                if self.memetic == "elite":
+                    for i in range(len(elite)):
+                        elite[i] = local_search.improve(elite[i])
 
             # Population is now new_population concatenated with the elite from the previous gen
             population = np.concatenate((new_population, elite), axis=0)
 
-            print("GENERATION: {}".format(count))
-            print("Best path cost: {}, Best path: {}".format(self.best_fit, self.best_path))
+            self.metrics.emit("ga_generation", generation=count, best_length=self.best_fit)
 
-        # Return the best path we have found
-        return self.best_path
+        return population
 
     # Helper to pick an index according to their probabilities
     def pick(self, probabilities):
-        # Initialize the index as 0
-        i = 0
         # Choose a random number between 0 and 1
-        p = random.uniform(0, 1)
-        # Remove probabilities at index until p <= 0 and then return that index
-        while(p > 0):
-            p -= probabilities[i]
-            i += 1
-        # Return chosen index
-        return i
+        p = self.rng.random()
+        # Return the first index where the cumulative probability reaches p
+        i = np.searchsorted(np.cumsum(probabilities), p, side="left")
+        return min(i, len(probabilities) - 1)
 
     # Helper to make fitness a probability
     def normalize(self, fitness):
@@ -124,62 +186,83 @@ class GeneticAlgorithm:
 
     # Helper to calculate the fitness of a path
     def fitness(self, chromosome, matrix):
-        # Initially distance is 0
-        d = 0
-        # If there are N points in a path, there are N-1 edges
-        for i in range(len(chromosome)-1):
-            # Index of first point in weight matrix
-            c1 = int(chromosome[i])
-            # Index of second point in weight matrix
-            c2 = int(chromosome[i+1])
-            # Get the weight between these two points and add it to the weight of the path
-            d += matrix[c1, c2]
+        distance = self.population_distances(np.asarray(chromosome)[None, :], matrix)
+        return self.distances_to_fitness(distance)[0]
 
-        # If the weight of the path is the best we've seen so far store it along with the path
-        if(d < self.best_fit):
-            self.best_fit = d
-            self.best_path = chromosome
+    # Helper to calculate the length of every path in a population at once
+    # @param population int array with a chromosome per row.
+    # @param matrix a CostModel or the distance matrix between the points.
+    # @return array with the length of each chromosome
+    def population_distances(self, population, matrix):
+        return CostModel.of(matrix).tour_costs(population)
 
-        # Return fitness value according to our fitness function 1/d^3
-        return 1/d**2
+    # Helper to turn path lengths into fitness values according to our fitness function 1/d^2
+    def distances_to_fitness(self, distances):
+        return 1 / np.asarray(distances, dtype=float) ** 2
 
+    # Helper to remember the best path seen so far
+    # @param population int array with a chromosome per row.
+    # @param distances length of each chromosome.
+    def update_best(self, population, distances):
+        best = np.argmin(distances)
+        # If the weight of the path is the best we've seen so far store it along with the path
+        if distances[best] < self.best_fit:
+            self.best_fit = distances[best]
+            self.best_path = population[best].copy()
 
-    # Helper to perform cross over between two chromosomes
+
+    # Helper to perform cross over between two chromosomes: a random slice of c1 followed by the points of c2 that are
+    # not in that slice, in the order they have in c2
     def cross_over(self, c1, c2):
         # Pick the random section to take from c1
-        start = random.randint(0, len(c1))
-        end = random.randint(start, len(c1))
-        #print("start: {} end: {}".format(start, end))
+        start = int(self.rng.integers(0, len(c1) + 1))
+        end = int(self.rng.integers(start, len(c1) + 1))
         # Start of the chromosome is the slice from c1
         new_chromosome = c1[start:end]
-        #print("split: {}".format(new_chromosome))
-        index = 0
-        leftovers = np.empty(len(c1)-len(new_chromosome))
-        # Make an array of the points not in the slice
-        for c in c2:
-            if(c not in new_chromosome):
-                leftovers[index] = c
-                index += 1
-        # Concatenate the slice and the leftovers
-        bromosome = np.concatenate((new_chromosome, leftovers), axis=0)
-        #print("leftovers: {}".format(leftovers))
-        #print("final new chromosome: {}".format(bromosome))
-        # Return resulting path
-        return bromosome
+        # Mark the points in the slice so checking if a point of c2 is in it takes constant time
+        taken = np.zeros(len(c1), dtype=bool)
+        taken[new_chromosome] = True
+        # Concatenate the slice and the points not in the slice
+        return np.concatenate((new_chromosome, c2[~taken[c2]]), axis=0)
+
+    # Helper to perform the cross over of cross_over for many pairs of parents at once
+    # @param parents1 int array with the first parent of every child per row.
+    # @param parents2 int array with the second parent of every child per row.
+    # @return int array with a child per row
+    def cross_over_population(self, parents1, parents2):
+        k, n = parents1.shape
+        rows = np.arange(k)[:, None]
+        # Pick the random section to take from each first parent
+        starts = self.rng.integers(0, n + 1, size=k)
+        ends = self.rng.integers(starts, n + 1)
+        positions = np.arange(n)
+        in_slice = (positions >= starts[:, None]) & (positions < ends[:, None])
+
+        # Mark the points in the slices, indexed by point
+        taken = np.zeros((k, n), dtype=bool)
+        taken[rows, parents1] = in_slice
+        leftover = ~taken[rows, parents2]
+
+        children = np.empty_like(parents1)
+        # The slice goes to the start of the child
+        r, c = np.nonzero(in_slice)
+        children[r, c - starts[r]] = parents1[r, c]
+        # Followed by the leftovers of the second parent in their order
+        rank = np.cumsum(leftover, axis=1) - 1
+        r, c = np.nonzero(leftover)
+        children[r, (ends - starts)[r] + rank[r, c]] = parents2[r, c]
+        return children
 
     # Helper to perform mutation on a chromosome
     def mutation(self, chromosome, mutation_rate):
-        # For each of the points(genes) there is a chance of mutation
-        for n in range(len(chromosome)):
-            i = random.uniform(0,1)
-            # Mutate with a certain probability
-            if(i < mutation_rate):
-                # First random point to swap
-                rand_index = random.randint(0, len(chromosome)-1)
-                #next_index = (rand_index + 1) % len(chromosome) # Mutation where only neighbours switch
-                next_index = random.randint(0, len(chromosome) -1) # If we don't just want to swap neighbours
-                # Swap the two points
-                self.swap(chromosome, rand_index, next_index)
+        # For each of the points(genes) there is a chance of mutation, draw them all at once
+        mutations = np.count_nonzero(self.rng.random(len(chromosome)) < mutation_rate)
+        # Two random points to swap for every mutation
+        swaps = self.rng.integers(0, len(chromosome), size=(mutations, 2)).tolist()
+        for rand_index, next_index in swaps:
+            #next_index = (rand_index + 1) % len(chromosome) # Mutation where only neighbours switch
+            # Swap the two points
+            self.swap(chromosome, rand_index, next_index)
         # Return chromosome after being mutated
         return chromosome
 
@@ -203,7 +286,8 @@ if __name__ == "__main__":
     persistFile = "./../data/productMatrixDist_3"
         
     #setup optimization
-    tsp_data = TSPData.read_from_file(persistFile)
+    # the persist files of the assignment were pickled by an older version
+    tsp_data = TSPData.read_pickle(persistFile)
     #print(tsp_data.distances)
     bsp = np.array(tsp_data.distances)
     # formatting the way numpy prints tables
@@ -213,11 +297,12 @@ if __name__ == "__main__":
     print(bsp)
     num_points = len(bsp)
     #tsp_data = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 16, 17]
-    ga = GeneticAlgorithm(generations, population_size, num_points, elite_number)
+    logging.basicConfig(level=logging.INFO)
+    ga = GeneticAlgorithm(generations, population_size, num_points, elite_number, metrics=Metrics(LoggingSink()))
 
-    #run optimzation and write to file
-    #solution = ga.solve_tsp(tsp_data)
-    solution = ga.solve_tsp(bsp)
+    #run optimzation and write to file, optimizing the full route including the start and end legs
+    #solution = ga.solve_tsp(bsp)
+    solution = ga.solve_tsp(CostModel.from_tsp_data(tsp_data))
     bolution = [round(solution) for solution in solution]
     print(bolution)
     tsp_data.write_action_file(bolution, "./../data/TSP solution.txt")
\ No newline at end of file
@@ -0,0 +1,105 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import multiprocessing
+
+import numpy as np
+from src.CostModel import CostModel
+from src.GeneticAlgorithm import GeneticAlgorithm
+from src.Metrics import Metrics
+from src.RandomStreams import make_generator, spawn_generators
+
+# Evolve one island inside a worker process.
+# @param ga the genetic algorithm of the island.
+# @param population the population of the island.
+# @param tsp_data the CostModel of the points.
+# @param generations amount of generations to evolve.
+# @return tuple of the genetic algorithm (with its best path) and the evolved population
+def evolve_island(ga, population, tsp_data, generations):
+    population = ga.evolve(population, tsp_data, generations)
+    return ga, population
+
+# Island model genetic algorithm: a number of populations evolve independently in separate processes and every
+# migration_interval generations the elite of each island migrates to its neighbouring islands, where it replaces the
+# worst chromosomes.
+class IslandGeneticAlgorithm:
+
+    # Constructs a new island model genetic algorithm.
+    # @param generations the amount of generations.
+    # @param pop_size the population size of each island.
+    # @param num_points number of points to vist
+    # @param num_elite number of chromosomes that make up the elite, and that migrate
+    # @param islands amount of islands.
+    # @param migration_interval amount of generations between migrations.
+    # @param topology "ring" to migrate to the next island only, "full" to migrate to all other islands.
+    # @param selection parent selection strategy from Selection, roulette wheel selection by default
+    # @param workers amount of worker processes, one per island by default
+    # @param memetic None, or "elite"/"offspring" to improve the elite/the children of every generation with LocalSearch
+    # @param metrics Metrics that get an "island_epoch" record after every migration interval, with the best_length so
+    # far and the seconds spent evolving (evolve_time) and migrating (migration_time). The islands record their
+    # generations in them too, from their worker processes.
+    # @param seed seed or numpy Generator, every island gets a child generator spawned from it.
+    def __init__(self, generations, pop_size, num_points, num_elite, islands, migration_interval, topology="ring",
+                 selection=None, workers=None, memetic=None, metrics=None, seed=None):
+        if topology not in ("ring", "full"):
+            raise ValueError("Unknown migration topology: " + str(topology))
+        self.generations = generations
+        self.pop_size = pop_size
+        self.num_elite = num_elite
+        self.migration_interval = migration_interval
+        self.topology = topology
+        self.workers = islands if workers is None else workers
+        self.metrics = Metrics() if metrics is None else metrics
+        # the islands carry their generators to the workers and back, so they don't evolve in lockstep and a seeded
+        # run gives the same result however the islands are spread over the workers
+        rngs = spawn_generators(make_generator(seed), islands)
+        self.islands = [GeneticAlgorithm(generations, pop_size, num_points, num_elite, selection, memetic, self.metrics,
+                                         rng) for rng in rngs]
+        self.best_fit = sys.maxsize
+        self.best_path = None
+
+    # Solve the TSP with all islands.
+    # @param tsp_data a CostModel or the distance matrix between the points.
+    # @return the best product sequence found on any island.
+    def solve_tsp(self, tsp_data):
+        tsp_data = CostModel.of(tsp_data)
+        populations = [ga.initial_population(len(tsp_data)) for ga in self.islands]
+
+        with multiprocessing.Pool(self.workers) as pool:
+            done = 0
+            while done < self.generations:
+                generations = min(self.migration_interval, self.generations - done)
+                with self.metrics.timer("evolve_time"):
+                    results = pool.starmap(evolve_island, [(ga, population, tsp_data, generations)
+                                                           for ga, population in zip(self.islands, populations)])
+                self.islands = [ga for ga, _ in results]
+                populations = [population for _, population in results]
+                done += generations
+                if done < self.generations:
+                    with self.metrics.timer("migration_time"):
+                        self.migrate(populations, tsp_data)
+                self.metrics.emit("island_epoch", generation=done,
+                                  best_length=min(ga.best_fit for ga in self.islands))
+
+        for ga in self.islands:
+            if ga.best_fit < self.best_fit:
+                self.best_fit = ga.best_fit
+                self.best_path = ga.best_path
+        return self.best_path
+
+    # Send the elite of every island to its neighbours, replacing their worst chromosomes.
+    # @param populations list with the population of every island, changed in place.
+    # @param tsp_data the CostModel of the points.
+    def migrate(self, populations, tsp_data):
+        distances = [tsp_data.tour_costs(population) for population in populations]
+        elites = [population[np.argsort(d)[:self.num_elite]].copy() for population, d in zip(populations, distances)]
+
+        for i, population in enumerate(populations):
+            if self.topology == "ring":
+                migrants = elites[i - 1]
+            else:
+                migrants = np.concatenate([elite for j, elite in enumerate(elites) if j != i], axis=0)
+            # never replace the island's own elite
+            migrants = migrants[:self.pop_size - self.num_elite]
+            worst = np.argsort(distances[i])[::-1][:len(migrants)]
+            population[worst] = migrants
@@ -0,0 +1,141 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.CostModel import CostModel
+
+# 2-opt and Or-opt improvement of product sequences. Moves are only tried towards the nearest neighbours of a point
+# and every move is evaluated from the few edges it changes: prefix sums of the edge weights along the path (both ways
+# round, so asymmetric distance matrices work too) give the cost of a reversed section in constant time.
+class LocalSearch:
+
+    # Constructs a new local search.
+    # @param matrix a CostModel or the distance matrix between the points.
+    # @param neighbours amount of nearest neighbours of each point that moves are tried towards.
+    # @param max_moves maximum amount of improving moves per call of improve, unlimited if None.
+    def __init__(self, matrix, neighbours=8, max_moves=None):
+        # The sequence is searched as a path from the start to the end of the cost model, which stay where they are.
+        cost_model = CostModel.of(matrix)
+        self.start = cost_model.start
+        self.end = cost_model.end
+        self.matrix = cost_model.matrix.tolist()
+
+        # nearest neighbours among the products, never the point itself or the start or end
+        n = cost_model.num_points
+        products = cost_model.matrix[:, :n].astype(float)
+        products[np.arange(n), np.arange(n)] = np.inf
+        ordered = np.argsort(products, axis=1, kind="stable")
+        self.neighbours = ordered[:, :min(neighbours, n - 1)].tolist()
+        self.max_moves = max_moves
+
+    # Improve a product sequence with 2-opt and Or-opt moves until neither finds an improvement.
+    # @param chromosome the product sequence.
+    # @return the improved product sequence as int array
+    def improve(self, chromosome):
+        path = [self.start] + [int(c) for c in chromosome] + [self.end]
+        moves = 0
+        while self.max_moves is None or moves < self.max_moves:
+            if self.two_opt(path) or self.or_opt(path):
+                moves += 1
+            else:
+                break
+        return np.array(path[1:-1], dtype=int)
+
+    # Apply the first improving 2-opt move (reversing a section of the path) that is found.
+    # @param path the path, changed in place. Its first and last point stay where they are.
+    # @return whether an improving move was applied
+    def two_opt(self, path):
+        last = len(path) - 1
+        position = self.positions(path)
+        forward, backward = self.prefix_sums(path)
+
+        for i in range(last - 1):
+            for c in self.neighbours[path[i]]:
+                # reverse path[i + 1..j] so that path[i] is followed by c
+                j = position[c]
+                if j <= i + 1 or j >= last:
+                    continue
+                if self.two_opt_delta(path, i, j, forward, backward) < 0:
+                    path[i + 1:j + 1] = path[j:i:-1]
+                    return True
+        return False
+
+    # Change in cost of reversing path[i + 1..j].
+    # @param path the path.
+    # @param i index of the point before the section, 0 <= i < j - 1.
+    # @param j index of the last point of the section, j < len(path) - 1.
+    # @param forward prefix sums of the path walked forward, see prefix_sums.
+    # @param backward prefix sums of the path walked backward, see prefix_sums.
+    # @return the change in cost, negative for an improvement
+    def two_opt_delta(self, path, i, j, forward, backward):
+        m = self.matrix
+        a = path[i]
+        b = path[i + 1]
+        c = path[j]
+        d = path[j + 1]
+        # the edges of the section change direction, the ones around it are replaced
+        return m[a][c] + m[b][d] + backward[j] - backward[i + 1] - m[a][b] - m[c][d] - forward[j] + forward[i + 1]
+
+    # Apply the first improving Or-opt move (moving a section of up to 3 points elsewhere) that is found.
+    # @param path the path, changed in place. Its first and last point stay where they are.
+    # @return whether an improving move was applied
+    def or_opt(self, path):
+        last = len(path) - 1
+        position = self.positions(path)
+
+        for length in (1, 2, 3):
+            for s in range(1, last - length + 1):
+                e = s + length - 1
+                # insert the section after a neighbour of its first point or before a neighbour of its last point
+                candidates = [position[c] for c in self.neighbours[path[s]]] \
+                             + [position[c] - 1 for c in self.neighbours[path[e]]]
+                for q in candidates:
+                    if q < 0 or q >= last or s - 1 <= q <= e:
+                        continue
+                    if self.or_opt_delta(path, s, e, q) < 0:
+                        self.move_section(path, s, e, q)
+                        return True
+        return False
+
+    # Change in cost of moving path[s..e] between path[q] and path[q + 1].
+    # @param path the path.
+    # @param s index of the first point of the section, at least 1.
+    # @param e index of the last point of the section, below len(path) - 1.
+    # @param q index of the point to insert the section after, outside s - 1..e and below len(path) - 1.
+    # @return the change in cost, negative for an improvement
+    def or_opt_delta(self, path, s, e, q):
+        m = self.matrix
+        first = path[s]
+        end = path[e]
+        removed = m[path[s - 1]][first] + m[end][path[e + 1]] - m[path[s - 1]][path[e + 1]]
+        added = m[path[q]][first] + m[end][path[q + 1]] - m[path[q]][path[q + 1]]
+        return added - removed
+
+    # Move path[s..e] between path[q] and path[q + 1], see or_opt_delta.
+    # @param path the path, changed in place.
+    def move_section(self, path, s, e, q):
+        section = path[s:e + 1]
+        del path[s:e + 1]
+        insert = q + 1 if q < s else q + 1 - len(section)
+        path[insert:insert] = section
+
+    # Position of every point in a path.
+    # @param path the path.
+    # @return list with the index of each point
+    def positions(self, path):
+        position = [0] * len(self.matrix)
+        for index, point in enumerate(path):
+            position[point] = index
+        return position
+
+    # Prefix sums of the edge weights along a path, walking it forward and backward.
+    # @param path the path.
+    # @return tuple of lists where element k is the weight of the first k edges
+    def prefix_sums(self, path):
+        m = self.matrix
+        forward = [0] * len(path)
+        backward = [0] * len(path)
+        for k in range(len(path) - 1):
+            forward[k + 1] = forward[k] + m[path[k]][path[k + 1]]
+            backward[k + 1] = backward[k] + m[path[k + 1]][path[k]]
+        return forward, backward
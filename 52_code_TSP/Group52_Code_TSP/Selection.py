@@ -0,0 +1,97 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.RandomStreams import make_generator
+
+# Parent selection strategies for the genetic algorithm. Every strategy has a select method that takes the fitness of
+# the population (higher is better) and draws all requested parent indices in one vectorized call, from the random
+# generator that is passed in (the one of the genetic algorithm).
+
+# Fitness proportionate (roulette wheel) selection using the cumulative distribution of the fitness.
+class RouletteSelection:
+
+    # Draw parent indices with a probability proportional to their fitness.
+    # @param fitness array with the fitness of every chromosome.
+    # @param count amount of indices to draw.
+    # @param rng seed or numpy Generator to draw with, see RandomStreams.make_generator.
+    # @return int array of chromosome indices
+    def select(self, fitness, count, rng=None):
+        rng = make_generator(rng)
+        cumulative = np.cumsum(fitness)
+        draws = rng.random(count) * cumulative[-1]
+        # the first chromosome whose cumulative fitness is over the draw, chromosomes without fitness are never picked
+        indices = np.searchsorted(cumulative, draws, side="right")
+        return np.minimum(indices, len(fitness) - 1)
+
+# Fitness proportionate selection using a Walker alias table, every draw takes constant time.
+class AliasSelection:
+
+    # Draw parent indices with a probability proportional to their fitness.
+    # @param fitness array with the fitness of every chromosome.
+    # @param count amount of indices to draw.
+    # @param rng seed or numpy Generator to draw with, see RandomStreams.make_generator.
+    # @return int array of chromosome indices
+    def select(self, fitness, count, rng=None):
+        rng = make_generator(rng)
+        probability, alias = self.build_table(fitness)
+        columns = rng.integers(0, len(fitness), size=count)
+        keep = rng.random(count) < probability[columns]
+        return np.where(keep, columns, alias[columns])
+
+    # Build the alias table (Vose's method).
+    # @param fitness array with the fitness of every chromosome.
+    # @return tuple of the probability of keeping each column and the alias of each column
+    def build_table(self, fitness):
+        n = len(fitness)
+        probability = np.asarray(fitness, dtype=float) * n / np.sum(fitness)
+        alias = np.arange(n)
+        small = list(np.flatnonzero(probability < 1))
+        large = list(np.flatnonzero(probability >= 1))
+        while len(small) > 0 and len(large) > 0:
+            s = small.pop()
+            l = large.pop()
+            alias[s] = l
+            # the large column gives away what the small column misses
+            probability[l] -= 1 - probability[s]
+            if probability[l] < 1:
+                small.append(l)
+            else:
+                large.append(l)
+        # whatever is left over is 1 up to rounding errors
+        probability[small] = 1
+        probability[large] = 1
+        return probability, alias
+
+# Tournament selection: the fittest of a few uniformly drawn chromosomes wins.
+class TournamentSelection:
+
+    # Constructs a new tournament selection.
+    # @param size amount of chromosomes in each tournament.
+    def __init__(self, size=2):
+        self.size = size
+
+    # Draw parent indices by holding a tournament for each of them.
+    # @param fitness array with the fitness of every chromosome.
+    # @param count amount of indices to draw.
+    # @param rng seed or numpy Generator to draw with, see RandomStreams.make_generator.
+    # @return int array of chromosome indices
+    def select(self, fitness, count, rng=None):
+        rng = make_generator(rng)
+        candidates = rng.integers(0, len(fitness), size=(count, self.size))
+        winners = np.argmax(np.asarray(fitness)[candidates], axis=1)
+        return candidates[np.arange(count), winners]
+
+# Linear rank selection: the probability of a chromosome is proportional to its rank instead of its fitness.
+class RankSelection:
+
+    # Draw parent indices with a probability proportional to their rank, the worst chromosome has rank 1.
+    # @param fitness array with the fitness of every chromosome.
+    # @param count amount of indices to draw.
+    # @param rng seed or numpy Generator to draw with, see RandomStreams.make_generator.
+    # @return int array of chromosome indices
+    def select(self, fitness, count, rng=None):
+        rng = make_generator(rng)
+        ranks = np.empty(len(fitness))
+        ranks[np.argsort(fitness)] = np.arange(1, len(fitness) + 1)
+        return RouletteSelection().select(ranks, count, rng)
@@ -1,13 +1,57 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
+import multiprocessing
+import multiprocessing.util
 import pickle
 import re
 import traceback
+
+import numpy as np
 from src.AntColonyOptimization import AntColonyOptimization
 from src.Coordinate import Coordinate
 from src.Maze import Maze
+from src.MazePruner import MazePruner
 from src.PathSpecification import PathSpecification
+from src.RandomStreams import spawn_generators
+from src.Route import Route
+
+# separator between the fields of a line in the product file
+SEPARATOR = re.compile("[:,;]\\s*")
+
+# version of the file format written by TSPData.write_to_file
+FORMAT_VERSION = 1
+
+# Optimization object of a route worker process, every worker has its own copy (and so its own maze).
+worker_aco = None
+
+# The route finder that does the work: the one wrapped by a CachedRouteFinder, or the finder itself.
+# @param aco the route finder.
+# @return the route finder that finds the routes
+def inner_finder(aco):
+    return getattr(aco, "finder", aco)
+
+# Set up a route worker process.
+# @param aco the optimization object to copy into the worker.
+def init_route_worker(aco):
+    global worker_aco
+    worker_aco = aco
+    # worker processes can't start a pool of their own
+    inner_finder(worker_aco).workers = 1
+    # the hits on a route cache are kept in memory, write them when the worker exits
+    cache = getattr(worker_aco, "cache", None)
+    if cache is not None:
+        multiprocessing.util.Finalize(cache, cache.close, exitpriority=10)
+
+# Solve a single route inside a route worker process.
+# @param task tuple of a key identifying the route, its PathSpecification and the random generator to solve it with
+# (None for route finders without one).
+# @return tuple of the key and the optimized route
+def solve_route(task):
+    key, spec, rng = task
+    if rng is not None:
+        inner_finder(worker_aco).rng = rng
+    return key, worker_aco.find_shortest_route(spec)
 
 # Class containing the product distances. Can be either build from a maze, a product
 # location list and a PathSpecification or be reloaded from a file.
@@ -30,13 +74,88 @@ class TSPData:
     # Calculate the routes from the product locations to each other, the start, and the end.
     # Additionally generate arrays that contain the length of all the routes.
     # @param maze
-    def calculate_routes(self, aco):
-        self.product_to_product = self.build_distance_matrix(aco)
+    # @param symmetric whether to optimize every pair of products once and use the reversed route the other way
+    def calculate_routes(self, aco, symmetric=False):
+        self.product_to_product = self.build_distance_matrix(aco, symmetric)
         self.start_to_product = self.build_start_to_products(aco)
         self.product_to_end = self.build_products_to_end(aco)
         self.build_distance_lists()
         return
 
+    # Same as calculate_routes, but runs the independent route optimizations in a pool of processes.
+    # @param aco optimization object, every worker gets its own copy.
+    # @param workers amount of worker processes.
+    # @param progress function called with the amount of finished routes and the total amount after every route,
+    # prints the progress by default.
+    # @param symmetric whether to optimize every pair of products once and use the reversed route the other way
+    def calculate_routes_parallel(self, aco, workers, progress=None, symmetric=False):
+        if progress is None:
+            progress = TSPData.print_progress
+        number_of_products = len(self.product_locations)
+        start = self.spec.get_start()
+        end = self.spec.get_end()
+
+        tasks = []
+        for i in range(number_of_products):
+            for j in range(number_of_products):
+                if i == j or (symmetric and j < i):
+                    continue
+                spec = PathSpecification(self.product_locations[i], self.product_locations[j])
+                tasks.append((("product", i, j), spec))
+        for i in range(number_of_products):
+            tasks.append((("start", i), PathSpecification(start, self.product_locations[i])))
+            tasks.append((("end", i), PathSpecification(self.product_locations[i], end)))
+        # every route gets its own random stream, so the routes don't depend on which worker solves them
+        if hasattr(inner_finder(aco), "rng"):
+            rngs = spawn_generators(inner_finder(aco).rng, len(tasks))
+        else:
+            rngs = [None] * len(tasks)
+        tasks = [(key, spec, rng) for (key, spec), rng in zip(tasks, rngs)]
+
+        self.product_to_product = [[None] * number_of_products for _ in range(number_of_products)]
+        for i in range(number_of_products):
+            self.product_to_product[i][i] = Route(self.product_locations[i])
+        self.start_to_product = [None] * number_of_products
+        self.product_to_end = [None] * number_of_products
+
+        with multiprocessing.Pool(workers, initializer=init_route_worker, initargs=(aco,)) as pool:
+            done = 0
+            for key, route in pool.imap_unordered(solve_route, tasks):
+                if key[0] == "product":
+                    self.product_to_product[key[1]][key[2]] = route
+                    if symmetric:
+                        self.product_to_product[key[2]][key[1]] = route.reversed()
+                elif key[0] == "start":
+                    self.start_to_product[key[1]] = route
+                else:
+                    self.product_to_end[key[1]] = route
+                done += 1
+                progress(done, len(tasks))
+            # let the workers exit by themselves instead of terminating them, so they run their finalizers
+            pool.close()
+            pool.join()
+
+        self.build_distance_lists()
+        return
+
+    # Default progress report of calculate_routes_parallel
+    # @param done amount of finished routes
+    # @param total total amount of routes
+    @staticmethod
+    def print_progress(done, total):
+        print("Routes done: {}/{}".format(done, total))
+
+    # Prune a maze for this problem: fill its dead ends, keeping the start, the end and all product locations.
+    # @param maze the maze to prune.
+    # @param contract whether to also contract the corridors into a CorridorGraph.
+    # @return the pruned maze, or the corridor graph of it. Both can be used to calculate the routes.
+    def prune_maze(self, maze, contract=False):
+        keep = [self.spec.get_start(), self.spec.get_end()] + self.product_locations
+        pruned = MazePruner.fill_dead_ends(maze, keep)
+        if contract:
+            return MazePruner.contract_corridors(pruned, keep)
+        return pruned
+
     # Build a list of integer distances of all the product-product routes.
     def build_distance_lists(self):
         number_of_products = len(self.product_locations)
@@ -78,10 +197,36 @@ class TSPData:
                and self.spec == other.spec \
                and self.product_locations == other.product_locations
 
-    # Persist object to file so that it can be reused later
+    # Persist object to file so that it can be reused later. The file is an uncompressed .npz archive (whatever the
+    # name of the file) of plain integer arrays: the locations, the distances and, when the routes are calculated, the
+    # direction values of all routes packed into one array with the offset of every route.
     # @param filePath Path to persist to
     def write_to_file(self, file_path):
-        pickle.dump(self, open(file_path, "wb"))
+        if self.distances is None and self.product_to_product is not None:
+            self.build_distance_lists()
+        start = self.spec.get_start()
+        end = self.spec.get_end()
+        arrays = {
+            "version": np.array(FORMAT_VERSION),
+            "locations": np.array([[c.get_x(), c.get_y()] for c in self.product_locations],
+                                  dtype=np.int64).reshape(-1, 2),
+            "spec": np.array([[start.get_x(), start.get_y()], [end.get_x(), end.get_y()]], dtype=np.int64),
+        }
+        if self.distances is not None:
+            arrays["distances"] = np.array(self.distances, dtype=np.int64).reshape(len(self.product_locations), -1)
+            arrays["start_distances"] = np.array(self.start_distances, dtype=np.int64)
+            arrays["end_distances"] = np.array(self.end_distances, dtype=np.int64)
+        if self.product_to_product is not None:
+            # product to product row by row, then start to product, then product to end
+            routes = [route for row in self.product_to_product for route in row] \
+                     + self.start_to_product + self.product_to_end
+            offsets = np.zeros(len(routes) + 1, dtype=np.int64)
+            np.cumsum([route.size() for route in routes], out=offsets[1:])
+            arrays["codes"] = np.concatenate([route.to_numpy() for route in routes] + [np.zeros(0, dtype=np.int8)])
+            arrays["offsets"] = offsets
+        # through a file object, so numpy doesn't add the .npz suffix
+        with open(file_path, "wb") as f:
+            np.savez(f, **arrays)
 
     # Write away an action file based on a solution from the TSP problem.
     # @param productOrder Solution of the TSP problem
@@ -117,18 +262,29 @@ class TSPData:
         f = open(file_path, "w")
         f.write(string)
 
-    # Calculate the optimal routes between all the individual routes
+    # Calculate the optimal routes between all the individual routes. The route from a product to itself is empty and
+    # is never optimized. Route finders that can find the routes from one start to many ends at once (such as
+    # ShortestPath) fill a whole row per call.
     # @param maze Maze to calculate optimal routes in
+    # @param symmetric whether to optimize only the routes from i to j > i and use their reverse from j to i
     # @return Optimal routes between all products in 2d array
-    def build_distance_matrix(self, aco):
+    def build_distance_matrix(self, aco, symmetric=False):
         number_of_product = len(self.product_locations)
+        if hasattr(aco, "find_shortest_routes"):
+            return [aco.find_shortest_routes(location, self.product_locations) for location in self.product_locations]
+
         product_to_product = []
         for i in range(number_of_product):
             product_to_product.append([])
             for j in range(number_of_product):
                 start = self.product_locations[i]
                 end = self.product_locations[j]
-                product_to_product[i].append(aco.find_shortest_route(PathSpecification(start, end)))
+                if i == j:
+                    product_to_product[i].append(Route(start))
+                elif symmetric and j < i:
+                    product_to_product[i].append(product_to_product[j][i].reversed())
+                else:
+                    product_to_product[i].append(aco.find_shortest_route(PathSpecification(start, end)))
         return product_to_product
 
 
@@ -137,6 +293,9 @@ class TSPData:
     # @return Optimal route from start to products
     def build_start_to_products(self, aco):
         start = self.spec.get_start()
+        if hasattr(aco, "find_shortest_routes"):
+            return aco.find_shortest_routes(start, self.product_locations)
+
         start_to_products = []
         for i in range(len(self.product_locations)):
             start_to_products.append(aco.find_shortest_route(PathSpecification(start, self.product_locations[i])))
@@ -147,6 +306,10 @@ class TSPData:
     # @return Optimal route from products to end
     def build_products_to_end(self, aco):
         end = self.spec.get_end()
+        if hasattr(aco, "find_shortest_routes"):
+            # moving through the maze costs the same both ways, so search once from the end
+            return [route.reversed() for route in aco.find_shortest_routes(end, self.product_locations)]
+
         products_to_end = []
         for i in range(len(self.product_locations)):
             products_to_end.append(aco.find_shortest_route(PathSpecification(self.product_locations[i], end)))
@@ -154,10 +317,57 @@ class TSPData:
 
     # Load TSP data from a file
     # @param filePath Persist file
+    # @param routes whether to load the routes too, otherwise only the distances are loaded
+    # @param allow_pickle whether to load files pickled by older versions too, see read_pickle. Only for files you
+    # trust, otherwise such files raise a ValueError.
+    # @return TSPData object from the file
+    @staticmethod
+    def read_from_file(file_path, routes=True, allow_pickle=False):
+        with open(file_path, "rb") as f:
+            is_npz = f.read(4) == b"PK\x03\x04"
+        if not is_npz:
+            if allow_pickle:
+                return TSPData.read_pickle(file_path)
+            raise ValueError("TSP data file " + file_path + " is not in the .npz format, use read_pickle to load "
+                             "files pickled by older versions")
+
+        with np.load(file_path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version > FORMAT_VERSION:
+                raise ValueError("TSP data file " + file_path + " has unknown version " + str(version))
+            product_locations = [Coordinate(x, y) for x, y in data["locations"].tolist()]
+            (start_x, start_y), (end_x, end_y) = data["spec"].tolist()
+            spec = PathSpecification(Coordinate(start_x, start_y), Coordinate(end_x, end_y))
+            tsp_data = TSPData(product_locations, spec)
+            if "distances" in data:
+                tsp_data.distances = data["distances"].tolist()
+                tsp_data.start_distances = data["start_distances"].tolist()
+                tsp_data.end_distances = data["end_distances"].tolist()
+            if routes and "codes" in data:
+                tsp_data.unpack_routes(data["codes"], data["offsets"])
+        return tsp_data
+
+    # Rebuild the routes from their packed direction values, in the order write_to_file packs them.
+    # @param codes int8 array of the direction values of all routes.
+    # @param offsets array with the start of every route in codes, and the end of the last one.
+    def unpack_routes(self, codes, offsets):
+        number_of_products = len(self.product_locations)
+        starts = [location for location in self.product_locations for _ in range(number_of_products)] \
+                 + [self.spec.get_start()] * number_of_products + self.product_locations
+        routes = [Route.from_codes(start, codes[offsets[i]:offsets[i + 1]].tobytes())
+                  for i, start in enumerate(starts)]
+        self.product_to_product = [routes[i * number_of_products:(i + 1) * number_of_products]
+                                   for i in range(number_of_products)]
+        self.start_to_product = routes[number_of_products * number_of_products:-number_of_products]
+        self.product_to_end = routes[-number_of_products:] if number_of_products > 0 else []
+
+    # Load TSP data that was pickled by older versions. Only load files you trust, unpickling can run any code.
+    # @param filePath Persist file
     # @return TSPData object from the file
     @staticmethod
-    def read_from_file(file_path):
-        return pickle.load(open(file_path, "rb"))
+    def read_pickle(file_path):
+        with open(file_path, "rb") as f:
+            return pickle.load(f)
 
     # Read a TSP problem specification based on a coordinate file and a product file
     # @param coordinates Path to the coordinate file
@@ -166,14 +376,14 @@ class TSPData:
     @staticmethod
     def read_specification(coordinates, product_file):
         try:
-            f = open(product_file, "r")
-            lines = f.read().splitlines()
+            with open(product_file, "r") as f:
+                lines = f.read().splitlines()
 
-            firstline = re.compile("[:,;]\\s*").split(lines[0])
+            firstline = SEPARATOR.split(lines[0])
             product_locations = []
             number_of_products = int(firstline[0])
             for i in range(number_of_products):
-                line = re.compile("[:,;]\\s*").split(lines[i + 1])
+                line = SEPARATOR.split(lines[i + 1])
                 product = int(line[0])
                 x = int(line[1])
                 y = int(line[2])
@@ -0,0 +1,69 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import unittest
+
+import numpy as np
+from src.CostModel import CostModel
+from src.LocalSearch import LocalSearch
+
+# Checks of the constant time move evaluation of LocalSearch against full tour costs, on an asymmetric matrix so
+# reversed sections cost something else than the original ones.
+class LocalSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(52)
+        self.products = 9
+        self.cost_model = CostModel(rng.integers(1, 100, size=(self.products + 2, self.products + 2)), pick_cost=1)
+        self.search = LocalSearch(self.cost_model)
+        self.path = [self.cost_model.start] + rng.permutation(self.products).tolist() + [self.cost_model.end]
+
+    # Cost of a path from the start to the end of the cost model.
+    def path_cost(self, path):
+        return self.cost_model.tour_cost(path[1:-1])
+
+    def test_two_opt_delta(self):
+        forward, backward = self.search.prefix_sums(self.path)
+        last = len(self.path) - 1
+        for i in range(last - 1):
+            for j in range(i + 2, last):
+                moved = list(self.path)
+                moved[i + 1:j + 1] = moved[j:i:-1]
+                delta = self.search.two_opt_delta(self.path, i, j, forward, backward)
+                self.assertEqual(delta, self.path_cost(moved) - self.path_cost(self.path), (i, j))
+
+    def test_or_opt_delta(self):
+        last = len(self.path) - 1
+        for length in (1, 2, 3):
+            for s in range(1, last - length + 1):
+                e = s + length - 1
+                for q in range(last):
+                    if s - 1 <= q <= e:
+                        continue
+                    moved = list(self.path)
+                    self.search.move_section(moved, s, e, q)
+                    self.assertEqual(sorted(moved), sorted(self.path))
+                    # the section ends up right after the point it was inserted after
+                    self.assertEqual(moved.index(self.path[s]) - 1, moved.index(self.path[q]))
+                    delta = self.search.or_opt_delta(self.path, s, e, q)
+                    self.assertEqual(delta, self.path_cost(moved) - self.path_cost(self.path), (s, e, q))
+
+    def test_moves_improve(self):
+        path = list(self.path)
+        while True:
+            before = self.path_cost(path)
+            if not (self.search.two_opt(path) or self.search.or_opt(path)):
+                break
+            self.assertLess(self.path_cost(path), before)
+            self.assertEqual((path[0], path[-1]), (self.cost_model.start, self.cost_model.end))
+
+    def test_improve(self):
+        chromosome = np.array(self.path[1:-1])
+        improved = self.search.improve(chromosome)
+        self.assertEqual(sorted(improved.tolist()), list(range(self.products)))
+        self.assertLessEqual(self.cost_model.tour_cost(improved), self.cost_model.tour_cost(chromosome))
+        # a local optimum stays as it is
+        np.testing.assert_array_equal(self.search.improve(improved), improved)
+
+if __name__ == "__main__":
+    unittest.main()
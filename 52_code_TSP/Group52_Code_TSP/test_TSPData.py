@@ -0,0 +1,82 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+from src.AntColonyOptimization import AntColonyOptimization
+from src.Coordinate import Coordinate
+from src.Maze import Maze
+from src.PathSpecification import PathSpecification
+from src.RouteCache import CachedRouteFinder, RouteCache
+from src.ShortestPath import ShortestPath
+from src.TSPData import TSPData
+
+# Maze drawn row by row, "#" is a wall.
+LAYOUT = [
+    "......#..",
+    ".####.#.#",
+    "...#.....",
+    "##.#.###.",
+    ".........",
+]
+
+# Checks of calculating TSP data in parallel and of persisting it with write_to_file and read_from_file.
+class TSPDataTest(unittest.TestCase):
+
+    def setUp(self):
+        walls = (np.array([[c == "." for c in row] for row in LAYOUT], dtype=np.uint8)).T.copy()
+        self.maze = Maze(walls, len(walls), len(walls[0]))
+        spec = PathSpecification(Coordinate(0, 0), Coordinate(8, 4))
+        self.tsp_data = TSPData([Coordinate(5, 0), Coordinate(2, 2), Coordinate(7, 0), Coordinate(0, 4)], spec)
+        self.tsp_data.calculate_routes(ShortestPath(self.maze))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.file_path = os.path.join(directory.name, "tsp_data.npz")
+
+    def test_round_trip(self):
+        self.tsp_data.write_to_file(self.file_path)
+        read = TSPData.read_from_file(self.file_path)
+        self.assertEqual(read, self.tsp_data)
+        self.assertEqual(read.get_start_distances(), self.tsp_data.get_start_distances())
+        self.assertEqual(read.get_end_distances(), self.tsp_data.get_end_distances())
+        self.assertEqual(read.product_to_product[1][3].get_end(), Coordinate(0, 4))
+
+    def test_distances_only(self):
+        self.tsp_data.write_to_file(self.file_path)
+        read = TSPData.read_from_file(self.file_path, routes=False)
+        self.assertIsNone(read.product_to_product)
+        self.assertEqual(read.get_distances(), self.tsp_data.get_distances())
+        self.assertEqual(read.get_start_distances(), self.tsp_data.get_start_distances())
+        self.assertEqual(read.get_end_distances(), self.tsp_data.get_end_distances())
+
+    def test_pickle(self):
+        with open(self.file_path, "wb") as f:
+            pickle.dump(self.tsp_data, f)
+        with self.assertRaises(ValueError):
+            TSPData.read_from_file(self.file_path)
+        self.assertEqual(TSPData.read_from_file(self.file_path, allow_pickle=True), self.tsp_data)
+
+    # Routes of a seeded ant colony optimization, calculated with a number of worker processes.
+    # @param workers amount of worker processes.
+    # @param cached whether to wrap the optimization in a CachedRouteFinder with a new cache.
+    # @return the TSP data
+    def parallel_routes(self, workers, cached):
+        aco = AntColonyOptimization(self.maze, 4, 3, 100, 0.1, seed=52)
+        if cached:
+            aco = CachedRouteFinder(aco, RouteCache(os.path.join(self.directory, "routes_{}.db".format(workers))))
+        tsp_data = TSPData(self.tsp_data.product_locations, self.tsp_data.spec)
+        tsp_data.calculate_routes_parallel(aco, workers, progress=lambda done, total: None)
+        return tsp_data
+
+    def test_parallel_seeded(self):
+        for cached in (False, True):
+            expected = self.parallel_routes(1, cached)
+            for workers in (2, 3):
+                self.assertEqual(self.parallel_routes(workers, cached), expected, (workers, cached))
+
+if __name__ == "__main__":
+    unittest.main()